@@ -0,0 +1,52 @@
+"""
+Compare the 'seek' and 'sequential' frame samplers on one or more clips.
+
+Run from the repository root:
+
+    python -m Backend.benchmarks.frame_sampling Backend/test.mp4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from Backend.preparation.frame_sampling import SAMPLING_STRATEGIES, sample_video_frames
+
+def time_strategy(video_path, num_frames, strategy, repeats):
+    timings = []
+    frames = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        frames = sample_video_frames(video_path, num_frames, strategy=strategy)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings)), frames
+
+def same_frames(frames_a, frames_b):
+    for frame_a, frame_b in zip(frames_a, frames_b):
+        if (frame_a is None) != (frame_b is None):
+            return False
+        if frame_a is not None and not np.array_equal(frame_a, frame_b):
+            return False
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark video frame sampling strategies")
+    parser.add_argument('videos', nargs='*', default=['Backend/test.mp4'])
+    parser.add_argument('--num-frames', type=int, default=60)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'Video':<40}" + "".join(f"{strategy + ' (ms)':>18}" for strategy in SAMPLING_STRATEGIES) + f"{'Speedup':>10}{'Same':>6}")
+    for video_path in args.videos:
+        timings = {}
+        sampled = {}
+        for strategy in SAMPLING_STRATEGIES:
+            timings[strategy], sampled[strategy] = time_strategy(video_path, args.num_frames, strategy, args.repeats)
+
+        speedup = timings['seek'] / timings['sequential']
+        identical = same_frames(sampled['seek'], sampled['sequential'])
+        print(f"{video_path:<40}" + "".join(f"{timings[strategy]:>18.1f}" for strategy in SAMPLING_STRATEGIES)
+              + f"{speedup:>9.2f}x{str(identical):>6}")
+
+if __name__ == "__main__":
+    main()
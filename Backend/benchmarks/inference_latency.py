@@ -0,0 +1,70 @@
+"""
+Per-call latency of a single-window (1, 60, features) prediction.
+
+Compares Keras model.predict, predict_on_batch and the compiled tf.function
+fast path of SignRecognition. Run from the repository root:
+
+    python -m Backend.benchmarks.inference_latency --model Backend/preparation/results/best.keras
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from Backend.preparation.modeling import CNNLSTMModel
+from Backend.preparation.features import feature_dim, load_feature_config
+from Backend.services.signrecognition_service import SignRecognition
+
+def measure(fn, batch_X, iterations, warmup=5):
+    """
+    Return latency statistics in milliseconds for `fn(batch_X)`.
+    """
+    for _ in range(warmup):
+        fn(batch_X)
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(batch_X)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings = np.array(timings)
+    return {
+        "mean_ms": float(timings.mean()),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-sequence inference latency")
+    parser.add_argument('--model', default='Backend/preparation/results/best.keras')
+    parser.add_argument('--labels', default='Backend/dataset/labels.json')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.labels, 'r', encoding='utf-8') as file:
+        num_classes = len(json.load(file))
+
+    # Đặc trưng và số chiều đầu vào theo cấu hình lưu cạnh model
+    feature_config = load_feature_config(args.model)
+    cnn_lstm_model = CNNLSTMModel(input_shape=(60, feature_dim(feature_config)), num_classes=num_classes)
+    cnn_lstm_model.load_model_from_file(args.model)
+    sign_recognition = SignRecognition(cnn_lstm_model, num_classes=num_classes, feature_config=feature_config)
+
+    coordinates = np.random.rand(60, 42, 2).astype(np.float32)
+    batch_X = sign_recognition.prepare_input(coordinates)[np.newaxis]
+    results = {
+        "model.predict": measure(lambda x: cnn_lstm_model.model.predict(x, verbose=0), batch_X, args.iterations),
+        "predict_on_batch": measure(sign_recognition.predict_proba_batch, batch_X, args.iterations),
+    }
+
+    sign_recognition.enable_fast_path()
+    results["compiled tf.function"] = measure(sign_recognition.predict_proba_batch, batch_X, args.iterations)
+
+    print(f"{'Path':<24}{'mean (ms)':>12}{'p50 (ms)':>12}{'p95 (ms)':>12}")
+    for name, stats in results.items():
+        print(f"{name:<24}{stats['mean_ms']:>12.2f}{stats['p50_ms']:>12.2f}{stats['p95_ms']:>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 import cv2
 import mediapipe as mp
-import numpy as np
 import json
-from keras.models import load_model # type: ignore
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from Backend.services.slidingwindow_service import LandmarkRingBuffer
+from Backend.services.gating_service import SegmentGate
+from Backend.services.signrecognition_service import SignRecognition
+from Backend.preparation.modeling import CNNLSTMModel
+from Backend.preparation.features import extract_landmarks, load_feature_config
+
+# Số frame mới giữa hai lần dự đoán (cửa sổ trượt 60 frame)
+PREDICTION_STRIDE = 10
 
 # Khởi tạo MediaPipe Hands
 mp_hands = mp.solutions.hands
@@ -17,9 +26,15 @@ hands = mp_hands.Hands(
 )
 
 # Load model và labels
-model = load_model('../preparation/results/best.keras')  
 with open('../dataset/labels.json', 'r', encoding='utf-8') as f:
     labels_json = json.load(f)
+model_path = '../preparation/results/best.keras'
+cnn_lstm_model = CNNLSTMModel(input_shape=(60, 84), num_classes=len(labels_json))
+cnn_lstm_model.load_model_from_file(model_path)
+# Cấu hình đặc trưng lưu cạnh model (thứ tự bàn tay, chuẩn hóa)
+feature_config = load_feature_config(model_path)
+# Dùng tf.function đã biên dịch thay cho model.predict để giảm độ trễ mỗi lần dự đoán
+sign_recognition = SignRecognition(cnn_lstm_model, num_classes=len(labels_json), fast_path=True, feature_config=feature_config)
 
 def get_label_by_index(index):
     """Lấy nhãn từ index"""
@@ -32,7 +47,6 @@ def process_frame(frame):
     """Xử lý frame và trích xuất tọa độ bàn tay"""
     frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     results = hands.process(frame_rgb)
-    coordinates = []
 
     if results.multi_hand_landmarks:
         # Vẽ các điểm mốc trên frame
@@ -44,20 +58,14 @@ def process_frame(frame):
                 mp_drawing_styles.get_default_hand_landmarks_style(),
                 mp_drawing_styles.get_default_hand_connections_style()
             )
-            
-            # Thu thập tọa độ
-            for lm in hand_landmarks.landmark:
-                coordinates.append([lm.x, lm.y])
 
-    # Đảm bảo luôn có 42 điểm (21 điểm x 2 bàn tay)
-    while len(coordinates) < 42:
-        coordinates.append([-1, -1])
-
-    return frame, coordinates
+    # Luôn có 42 điểm (21 điểm x 2 bàn tay), cùng hàm trích xuất với server và preprocessing
+    return frame, extract_landmarks(results, feature_config['hand_order'])
 
 def main():
     cap = cv2.VideoCapture(0)
-    frame_buffer = []
+    # Chỉ dự đoán trong đoạn ký hiệu (có tay và đang chuyển động) và một lần khi đoạn kết thúc
+    landmark_buffer = LandmarkRingBuffer(window_size=60, stride=PREDICTION_STRIDE, gate=SegmentGate())
     prediction_text = "Đang chờ..."
     
     while cap.isOpened():
@@ -69,31 +77,21 @@ def main():
         # Xử lý frame
         frame, coordinates = process_frame(frame)
         
-        # Kiểm tra nếu có bàn tay trong frame
-        has_hand = any(coord != [-1, -1] for coord in coordinates)
-        
-        if has_hand:
-            frame_buffer.append(coordinates)
+        # Mọi frame đều vào cửa sổ (kể cả frame không có tay) để giữ đúng nhịp thời gian
+        if landmark_buffer.push(coordinates):
+            landmark_buffer.mark_predicted()
+
+            # Dự đoán trên cửa sổ (60, 84)
+            predicted_index = sign_recognition.predict(landmark_buffer.window())
             
-            # Khi đủ 60 frames, thực hiện dự đoán
-            if len(frame_buffer) >= 60:
-                # Chuẩn bị dữ liệu cho model
-                data_X = np.array(frame_buffer, dtype=np.float32)
-                data_X = data_X.reshape(1, 60, -1)  # Reshape thành (1, 60, 84)
-                
-                # Dự đoán
-                predictions = model.predict(data_X)
-                predicted_index = np.argmax(predictions)
-                
-                # Lấy nhãn
-                label = get_label_by_index(predicted_index)
-                if label:
-                    prediction_text = f"Dự đoán: {label}"
-                
-                # Reset buffer
-                frame_buffer = []
-        else:
+            # Lấy nhãn
+            label = get_label_by_index(predicted_index)
+            if label:
+                prediction_text = f"Dự đoán: {label}"
+        elif not bool((coordinates != -1).any()):
             prediction_text = "Không phát hiện bàn tay"
+        elif landmark_buffer.gate_event == 'end':
+            prediction_text = "Không có ký hiệu"
 
         # Hiển thị kết quả lên frame
         cv2.putText(
@@ -1,6 +1,7 @@
 from services.videoprocess_service import VideoProcessor
 from services.signrecognition_service import SignRecognition
 from preparation.modeling import CNNLSTMModel # test
+from preparation.features import feature_dim, load_feature_config
 import json
 import numpy as np
 
@@ -10,14 +11,16 @@ with open('./dataset/labels.json', 'r', encoding='utf-8') as file:
 num_classes = len(labels_json)
 
 model_path = './preparation/results/best.keras'
-cnn_lstm_model = CNNLSTMModel(input_shape=(60, 84), num_classes=num_classes)
+# Cấu hình đặc trưng lưu cạnh model: thứ tự bàn tay và đặc trưng phải trùng với lúc huấn luyện
+feature_config = load_feature_config(model_path)
+cnn_lstm_model = CNNLSTMModel(input_shape=(60, feature_dim(feature_config)), num_classes=num_classes)
 cnn_lstm_model.load_model_from_file(model_path)
 # Initialize the VideoProcessor and SignRecognition
-video_processor = VideoProcessor()
-data_X, frames = video_processor.process_video_from_path("D:/Final_Project/VSL-Translator-Duong/output_video.mp4")
+video_processor = VideoProcessor(hand_order=feature_config['hand_order'])
+data_X, frames = video_processor.process_video_from_path("D:/Final_Project/VSL-Translator-Duong/output_video.mp4", export_folder="output1")
 
 # Initialize the SignRecognition class with the model path
-sign_recognition = SignRecognition(cnn_lstm_model)
+sign_recognition = SignRecognition(cnn_lstm_model, num_classes=num_classes, feature_config=feature_config)
 # Predict the sign label from the processed coordinates
 predicted_index = sign_recognition.predict(data_X)
 
@@ -0,0 +1,322 @@
+import json
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib.pyplot as plt
+from keras.callbacks import EarlyStopping # type: ignore
+from keras.models import load_model # type: ignore
+from modeling import CNNLSTMModel, DEFAULT_ARCHITECTURE, measure_inference_latency, set_tf_threads
+from dataset_format import load_dataset, load_metadata
+from features import DEFAULT_FEATURE_CONFIG, feature_dim, save_feature_config
+from vsldataset import VSLDataset
+
+# Không gian tìm kiếm: số filter nhân đôi theo từng conv block, số unit LSTM giảm một nửa theo từng lớp
+SEARCH_SPACE = {
+    'conv_blocks': [1, 2],
+    'conv_filters': [16, 32, 64],
+    'kernel_size': [3, 5],
+    'lstm_layers': [1, 2],
+    'lstm_units': [16, 32, 64],
+    'bidirectional': [True, False],
+    'dense_units': [32, 64],
+    'dropout': [0.2, 0.3, 0.5],
+}
+
+def sample_architecture(rng, search_space=SEARCH_SPACE):
+    """
+    Draw one architecture dict for CNNLSTMModel from `search_space`.
+
+    :param rng: numpy Generator.
+    """
+    def choice(key):
+        values = search_space[key]
+        return values[rng.integers(len(values))]
+
+    conv_blocks, filters, lstm_layers, units = choice('conv_blocks'), choice('conv_filters'), choice('lstm_layers'), choice('lstm_units')
+    return {
+        'conv_filters': tuple(filters * 2 ** i for i in range(conv_blocks)),
+        'kernel_sizes': tuple(int(choice('kernel_size')) for _ in range(conv_blocks)),
+        'lstm_units': tuple(max(8, units // 2 ** i) for i in range(lstm_layers)),
+        'bidirectional': bool(choice('bidirectional')),
+        'dense_units': int(choice('dense_units')),
+        'dropout': float(choice('dropout')),
+    }
+
+def pareto_front(trials):
+    """
+    Trials not dominated by any other one (higher or equal accuracy and lower or
+    equal latency, strictly better in at least one).
+
+    :param trials: Dicts with 'val_accuracy' and 'latency_ms'.
+    :return: The non-dominated trials, sorted by latency.
+    """
+    front = []
+    for trial in trials:
+        dominated = any(
+            other['val_accuracy'] >= trial['val_accuracy'] and other['latency_ms'] <= trial['latency_ms']
+            and (other['val_accuracy'] > trial['val_accuracy'] or other['latency_ms'] < trial['latency_ms'])
+            for other in trials
+        )
+        if not dominated:
+            front.append(trial)
+    return sorted(front, key=lambda trial: trial['latency_ms'])
+
+def _run_trial(trial_config):
+    """
+    Train one trial up to `epochs` total epochs; runs in its own worker process.
+
+    A trial continues from the model saved by its previous rung, so successive
+    halving never retrains the epochs already spent. The result file is
+    rewritten after every rung so an interrupted search can resume.
+    """
+    set_tf_threads(trial_config['threads_per_worker'])
+
+    dataset = VSLDataset(trial_config['x_file'], trial_config['y_file'])
+    feature_config = trial_config['feature_config']
+    X_train, y_train = dataset.load_features(trial_config['train_idx'], feature_config)
+    X_val, y_val = dataset.load_features(trial_config['val_idx'], feature_config)
+
+    previous = trial_config['previous']
+    if previous is None:
+        model = CNNLSTMModel(input_shape=(X_train.shape[1], feature_dim(feature_config)), num_classes=trial_config['num_classes'],
+                             architecture=trial_config['architecture']).model
+        history, epochs_trained = {}, 0
+    else:
+        model = load_model(trial_config['model_path'])
+        history, epochs_trained = previous['history'], previous['epochs_trained']
+
+    train_dataset = VSLDataset.in_memory_batches(X_train, y_train, shuffle=True)
+    val_dataset = VSLDataset.in_memory_batches(X_val, y_val)
+
+    early_stopping = EarlyStopping(monitor='val_loss', patience=trial_config['patience'], restore_best_weights=True, mode='min')
+    fit_history = model.fit(
+        train_dataset,
+        validation_data=val_dataset,
+        initial_epoch=epochs_trained,
+        epochs=trial_config['epochs'],
+        callbacks=[early_stopping],
+        verbose=0
+    )
+    model.save(trial_config['model_path'])
+    # Model của trial có thể được chọn để phục vụ: lưu cấu hình đặc trưng đi kèm
+    save_feature_config(trial_config['model_path'], feature_config)
+
+    for key, values in fit_history.history.items():
+        history.setdefault(key, []).extend(float(v) for v in values)
+    new_epochs = len(fit_history.history.get('loss', []))
+
+    result = {
+        'config': trial_config['config_key'],
+        'trial': trial_config['trial'],
+        'architecture': trial_config['architecture'],
+        'epochs_trained': epochs_trained + new_epochs,
+        # Dừng sớm trước khi hết ngân sách: không huấn luyện thêm ở rung sau
+        'stopped': epochs_trained + new_epochs < trial_config['epochs'],
+        'val_accuracy': float(max(history.get('val_accuracy', [0.0]))),
+        'num_params': int(model.count_params()),
+        'history': history,
+        'latency_ms': previous.get('latency_ms') if previous else None,
+    }
+    with open(trial_config['result_path'], 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+    return result
+
+def _measure_latency(latency_config):
+    """
+    Median / p95 single-window CPU latency of a saved model, in its own process
+    with a fixed thread count so trials are measured under the same conditions.
+    """
+    set_tf_threads(latency_config['threads'])
+    model = load_model(latency_config['model_path'])
+    median_ms, p95_ms = measure_inference_latency(model, repeats=latency_config['repeats'])
+    return latency_config['trial'], median_ms, p95_ms
+
+class ArchitectureSearch:
+    def __init__(self, data_path='../dataset/', results_dir='search_results', train_size=0.7, val_size=0.2,
+                 feature_config=None):
+        """
+        Successive-halving search over CNNLSTMModel architectures.
+
+        Trials are scored on the same validation split as VSLDataset.create_datasets
+        (the test split is never touched) and every trial also gets its CPU
+        inference latency measured, so the accuracy/latency Pareto front can be
+        used to pick the model to serve.
+
+        :param results_dir: Folder for trial models, per-trial result files and the report.
+        :param feature_config: features.py config the trials are trained on; defaults to
+                               DEFAULT_FEATURE_CONFIG with the dataset's hand order, as in modeling.py.
+        """
+        self.data_path = data_path
+        self.results_dir = results_dir
+        with open(os.path.join(data_path, 'labels.json'), 'r', encoding='utf-8') as f:
+            self.labels = json.load(f)
+
+        self.x_file = os.path.join(data_path, 'data_X.npy')
+        self.y_file = os.path.join(data_path, 'data_Y.npy')
+        _, data_Y = load_dataset(self.x_file, self.y_file)
+        if feature_config is None:
+            metadata = load_metadata(self.x_file) or {}
+            feature_config = {**DEFAULT_FEATURE_CONFIG, 'hand_order': metadata.get('hand_order', 'detection')}
+        self.feature_config = feature_config
+
+        # Cùng cách chia với VSLDataset.create_datasets để tập validation trùng nhau
+        self.train_idx, self.val_idx, _ = VSLDataset.split_indices(len(data_Y), train_size, val_size)
+
+    def run(self, num_trials=16, min_epochs=4, max_epochs=36, reduction_factor=3, patience=5,
+            num_workers=1, threads_per_worker=None, latency_threads=1, latency_repeats=200,
+            search_space=SEARCH_SPACE, seed=42):
+        """
+        :param num_trials: Architectures sampled; trial 0 is always DEFAULT_ARCHITECTURE as a baseline.
+        :param min_epochs: Epoch budget of the first rung.
+        :param max_epochs: Epoch budget of the last rung.
+        :param reduction_factor: Each rung keeps the best 1/reduction_factor trials and
+                                 multiplies the epoch budget by reduction_factor.
+        :param patience: Early stopping patience on val_loss inside a rung.
+        :param num_workers: Trials trained concurrently, each in its own process.
+        :param threads_per_worker: TensorFlow intra-op threads per worker (None = TF default).
+        :param latency_threads: Threads used when measuring inference latency.
+        :param latency_repeats: Timed single-window predictions per trial.
+        :return: (trials, front) lists of trial result dicts.
+        """
+        trial_dir = os.path.join(self.results_dir, 'trials')
+        os.makedirs(trial_dir, exist_ok=True)
+        config_key = (f"n{num_trials}_min{min_epochs}_max{max_epochs}_eta{reduction_factor}_seed{seed}_data{len(self.train_idx)}"
+                      f"_features{self.feature_config['version']}-{self.feature_config['hand_order']}")
+
+        rng = np.random.default_rng(seed)
+        architectures = [dict(DEFAULT_ARCHITECTURE)] + [sample_architecture(rng, search_space) for _ in range(num_trials - 1)]
+
+        results = {}
+        for trial in range(num_trials):
+            previous = self._load_trial(self._result_path(trial), config_key)
+            if previous is not None:
+                results[trial] = previous
+
+        survivors = list(range(num_trials))
+        budget = min_epochs
+        while True:
+            budget = min(budget, max_epochs)
+            print(f"\nRung: {len(survivors)} trials, {budget} epochs")
+            pending = []
+            for trial in survivors:
+                previous = results.get(trial)
+                if previous is not None and (previous['epochs_trained'] >= budget or previous['stopped']):
+                    continue
+                pending.append(self._trial_config(trial, architectures[trial], budget, patience, threads_per_worker, config_key, previous))
+
+            for result in self._map(_run_trial, pending, num_workers):
+                print(f"Trial {result['trial']}: val_accuracy {result['val_accuracy']:.4f} "
+                      f"after {result['epochs_trained']} epochs, {result['num_params']} params")
+                results[result['trial']] = result
+
+            if budget >= max_epochs or len(survivors) <= 1:
+                break
+            # Giữ lại 1/reduction_factor trial tốt nhất cho rung tiếp theo
+            survivors = sorted(survivors, key=lambda trial: results[trial]['val_accuracy'], reverse=True)
+            survivors = survivors[:max(1, len(survivors) // reduction_factor)]
+            budget *= reduction_factor
+
+        self._measure_latencies(results, latency_threads, latency_repeats)
+
+        trials = [results[trial] for trial in range(num_trials)]
+        front = pareto_front(trials)
+        self._save_report(trials, front)
+        return trials, front
+
+    def _trial_config(self, trial, architecture, budget, patience, threads_per_worker, config_key, previous):
+        return {
+            'trial': trial,
+            'config_key': config_key,
+            'architecture': architecture,
+            'x_file': self.x_file,
+            'y_file': self.y_file,
+            'feature_config': self.feature_config,
+            'train_idx': self.train_idx,
+            'val_idx': self.val_idx,
+            'num_classes': len(self.labels),
+            'epochs': budget,
+            'patience': patience,
+            'threads_per_worker': threads_per_worker,
+            'model_path': os.path.join(self.results_dir, 'trials', f'trial_{trial:03d}.keras'),
+            'result_path': self._result_path(trial),
+            'previous': previous,
+        }
+
+    def _map(self, fn, configs, num_workers):
+        if num_workers > 1 and len(configs) > 1:
+            # TensorFlow không an toàn với fork: dùng spawn cho các process con
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=num_workers, mp_context=context) as pool:
+                return list(pool.map(fn, configs))
+        return [fn(config) for config in configs]
+
+    def _measure_latencies(self, results, threads, repeats):
+        pending = [{
+            'trial': trial,
+            'model_path': os.path.join(self.results_dir, 'trials', f'trial_{trial:03d}.keras'),
+            'threads': threads,
+            'repeats': repeats,
+        } for trial, result in sorted(results.items()) if result.get('latency_ms') is None]
+        if not pending:
+            return
+
+        # Đo lần lượt trong một process riêng để các trial không tranh CPU với nhau
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            for trial, median_ms, p95_ms in pool.map(_measure_latency, pending):
+                results[trial]['latency_ms'] = median_ms
+                results[trial]['latency_p95_ms'] = p95_ms
+                with open(self._result_path(trial), 'w', encoding='utf-8') as f:
+                    json.dump(results[trial], f)
+
+    def _result_path(self, trial):
+        return os.path.join(self.results_dir, 'trials', f'trial_{trial:03d}.json')
+
+    def _load_trial(self, result_path, config_key):
+        if not os.path.exists(result_path):
+            return None
+        with open(result_path, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+        # Kết quả của cấu hình tìm kiếm khác không dùng lại
+        return result if result.get('config') == config_key else None
+
+    def _save_report(self, trials, front):
+        front_ids = {trial['trial'] for trial in front}
+        report = {
+            'trials': [{key: value for key, value in trial.items() if key != 'history'} for trial in trials],
+            'pareto_front': sorted(front_ids),
+        }
+        report_path = os.path.join(self.results_dir, 'search_report.json')
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+
+        plt.figure(figsize=(8, 6))
+        others = [trial for trial in trials if trial['trial'] not in front_ids]
+        plt.scatter([t['latency_ms'] for t in others], [t['val_accuracy'] for t in others], alpha=0.5, label='Trials')
+        plt.plot([t['latency_ms'] for t in front], [t['val_accuracy'] for t in front], 'ro-', label='Pareto front')
+        for trial in trials:
+            plt.annotate(str(trial['trial']), (trial['latency_ms'], trial['val_accuracy']), fontsize=8)
+        plt.xlabel('CPU latency (ms / window)')
+        plt.ylabel('Validation accuracy')
+        plt.title('Architecture search')
+        plt.legend()
+        plt.savefig(os.path.join(self.results_dir, 'pareto_front.png'))
+        plt.close()
+
+        print("\nKết quả tìm kiếm kiến trúc:")
+        print(f"{'Trial':>6}{'Val acc':>10}{'Latency (ms)':>14}{'Params':>10}{'Epochs':>8}  Pareto")
+        for trial in sorted(trials, key=lambda t: t['latency_ms']):
+            print(f"{trial['trial']:>6}{trial['val_accuracy']:>10.4f}{trial['latency_ms']:>14.2f}"
+                  f"{trial['num_params']:>10}{trial['epochs_trained']:>8}  {'*' if trial['trial'] in front_ids else ''}")
+        print(f"Report saved to '{report_path}'")
+
+if __name__ == "__main__":
+    search = ArchitectureSearch()
+    trials, front = search.run(
+        num_trials=16, min_epochs=4, max_epochs=36, reduction_factor=3,
+        num_workers=min(4, os.cpu_count() or 1), threads_per_worker=max(1, (os.cpu_count() or 1) // 4)
+    )
+    print("\nCác kiến trúc trên Pareto front:")
+    for trial in front:
+        print(f"Trial {trial['trial']}: {trial['architecture']}")
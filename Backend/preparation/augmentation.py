@@ -0,0 +1,103 @@
+import math
+import tensorflow as tf
+from features import NUM_POINTS, POINTS_PER_HAND
+
+class LandmarkAugmenter:
+    def __init__(self, rotation_range=15.0, scale_range=(0.9, 1.1), translation_range=0.05,
+                 jitter_std=0.005, time_warp_range=(0.8, 1.2), mirror_prob=0.5, frame_dropout_prob=0.05,
+                 hand_order='detection'):
+        """
+        On-the-fly augmentation of landmark batches inside the tf.data pipeline.
+
+        Works on batches of shape (batch, timesteps, 84), viewed as (batch, timesteps, 42, 2)
+        normalized image coordinates. Points equal to the -1 "no hand" sentinel are never
+        moved and stay exactly -1, so the model sees the same missing-hand encoding
+        as with MediaPipe output.
+
+        :param rotation_range: Max rotation in degrees around the image center.
+        :param scale_range: (min, max) zoom factor.
+        :param translation_range: Max shift in normalized coordinates.
+        :param jitter_std: Std of per-point Gaussian noise.
+        :param time_warp_range: (min, max) playback speed; the sequence is resampled to the same length.
+        :param mirror_prob: Probability of a horizontal flip (left/right hand slots swapped).
+        :param frame_dropout_prob: Probability of dropping a frame (all points set to -1).
+        :param hand_order: Slot ordering of the dataset (features.extract_landmarks). With
+                           'handedness' a flip always swaps the slots, since it turns the
+                           left hand into a right one; with 'detection' only frames with
+                           both hands are swapped.
+        """
+        self.rotation_range = rotation_range
+        self.scale_range = scale_range
+        self.translation_range = translation_range
+        self.jitter_std = jitter_std
+        self.time_warp_range = time_warp_range
+        self.mirror_prob = mirror_prob
+        self.frame_dropout_prob = frame_dropout_prob
+        self.hand_order = hand_order
+
+    def __call__(self, batch_X, batch_y):
+        shape = tf.shape(batch_X)
+        points = tf.reshape(batch_X, (shape[0], shape[1], NUM_POINTS, 2))
+        valid = tf.reduce_all(points != -1.0, axis=-1, keepdims=True)
+
+        points = self._affine(points)
+        points = points + tf.random.normal(tf.shape(points), stddev=self.jitter_std)
+        points, valid = self._mirror(points, valid)
+        points, valid = self._time_warp(points, valid)
+        valid = self._frame_dropout(valid)
+
+        # Giữ nguyên giá trị -1 cho các điểm không phát hiện được bàn tay
+        points = tf.where(valid, points, -tf.ones_like(points))
+        return tf.reshape(points, shape), batch_y
+
+    def _affine(self, points):
+        batch_size = tf.shape(points)[0]
+        angle = tf.random.uniform((batch_size,), -1.0, 1.0) * self.rotation_range * math.pi / 180.0
+        scale = tf.random.uniform((batch_size, 1, 1, 1), self.scale_range[0], self.scale_range[1])
+        shift = tf.random.uniform((batch_size, 1, 1, 2), -self.translation_range, self.translation_range)
+
+        cos, sin = tf.cos(angle), tf.sin(angle)
+        rotation = tf.reshape(tf.stack([cos, -sin, sin, cos], axis=-1), (batch_size, 2, 2))
+
+        # Xoay và co giãn quanh tâm ảnh (0.5, 0.5)
+        centered = points - 0.5
+        rotated = tf.einsum('btpi,bji->btpj', centered, rotation)
+        return rotated * scale + 0.5 + shift
+
+    def _mirror(self, points, valid):
+        batch_size = tf.shape(points)[0]
+        flip = tf.random.uniform((batch_size, 1, 1, 1)) < self.mirror_prob
+
+        flipped = tf.concat([1.0 - points[..., :1], points[..., 1:]], axis=-1)
+        # Lật ảnh đổi tay trái/phải: đổi chỗ hai bàn tay khi cả hai cùng xuất hiện trong frame
+        both_hands = tf.logical_and(
+            tf.reduce_all(valid[:, :, :POINTS_PER_HAND], axis=[2, 3], keepdims=True),
+            tf.reduce_all(valid[:, :, POINTS_PER_HAND:], axis=[2, 3], keepdims=True)
+        )
+        swapped = tf.concat([flipped[:, :, POINTS_PER_HAND:], flipped[:, :, :POINTS_PER_HAND]], axis=2)
+        if self.hand_order == 'handedness':
+            # Mặt nạ hợp lệ cũng đổi chỗ theo bàn tay
+            swapped_valid = tf.concat([valid[:, :, POINTS_PER_HAND:], valid[:, :, :POINTS_PER_HAND]], axis=2)
+            return tf.where(flip, swapped, points), tf.where(flip, swapped_valid, valid)
+        flipped = tf.where(both_hands, swapped, flipped)
+        return tf.where(flip, flipped, points), valid
+
+    def _time_warp(self, points, valid):
+        batch_size = tf.shape(points)[0]
+        timesteps = tf.shape(points)[1]
+        last = tf.cast(timesteps - 1, tf.float32)
+
+        speed = tf.random.uniform((batch_size, 1), self.time_warp_range[0], self.time_warp_range[1])
+        span = last * speed
+        # Chậm lại (speed < 1): lấy ngẫu nhiên một đoạn con; nhanh lên: lặp lại frame cuối
+        start = tf.random.uniform((batch_size, 1)) * tf.maximum(last - span, 0.0)
+        steps = tf.linspace(0.0, 1.0, timesteps)[tf.newaxis, :]
+        positions = tf.clip_by_value(start + steps * span, 0.0, last)
+        # Lấy frame gần nhất thay vì nội suy để không trộn tọa độ với giá trị -1
+        indices = tf.cast(tf.round(positions), tf.int32)
+        return tf.gather(points, indices, batch_dims=1), tf.gather(valid, indices, batch_dims=1)
+
+    def _frame_dropout(self, valid):
+        shape = tf.shape(valid)
+        keep = tf.random.uniform((shape[0], shape[1], 1, 1)) >= self.frame_dropout_prob
+        return tf.logical_and(valid, keep)
@@ -3,14 +3,64 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.model_selection import KFold
 from sklearn.metrics import confusion_matrix
+from keras.callbacks import EarlyStopping # type: ignore
 import json
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from vsldataset import VSLDataset
-from modeling import CNNLSTMModel
-import tensorflow as tf
+from modeling import CNNLSTMModel, set_tf_threads
+from dataset_format import load_dataset, load_metadata
+from features import DEFAULT_FEATURE_CONFIG, feature_dim
+
+def _run_fold(fold_config):
+    """
+    Train and evaluate one cross-validation fold; runs in its own worker process.
+
+    The fold result is written to `checkpoint_path` as soon as it finishes so an
+    interrupted run can resume from the completed folds.
+    """
+    set_tf_threads(fold_config['threads_per_worker'])
+
+    dataset = VSLDataset(fold_config['x_file'], fold_config['y_file'])
+    feature_config = fold_config['feature_config']
+    X_train, y_train = dataset.load_features(fold_config['train_idx'], feature_config)
+    X_val, y_val = dataset.load_features(fold_config['val_idx'], feature_config)
+
+    model = CNNLSTMModel(input_shape=(X_train.shape[1], feature_dim(feature_config)), num_classes=fold_config['num_classes'])
+    train_dataset = VSLDataset.in_memory_batches(X_train, y_train)
+    val_dataset = VSLDataset.in_memory_batches(X_val, y_val)
+
+    early_stopping = EarlyStopping(monitor='val_loss', patience=fold_config['patience'], restore_best_weights=True, mode='min')
+    history = model.model.fit(
+        train_dataset,
+        validation_data=val_dataset,
+        epochs=fold_config['epochs'],
+        callbacks=[early_stopping],
+        verbose=2
+    )
+
+    # Evaluate với trọng số tốt nhất
+    val_pred = np.argmax(model.model.predict(X_val, verbose=0), axis=1)
+    cm = confusion_matrix(y_val.astype(int), val_pred, labels=range(fold_config['num_classes']))
+
+    result = {
+        'config': fold_config['config_key'],
+        'fold': fold_config['fold'],
+        'accuracy': float(np.trace(cm) / max(cm.sum(), 1)),
+        'history': {key: [float(v) for v in values] for key, values in history.history.items()},
+        'confusion_matrix': cm.tolist(),
+    }
+    with open(fold_config['checkpoint_path'], 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+    return result
 
 class DataAnalyzer:
-    def __init__(self, data_path='../dataset/'):
+    def __init__(self, data_path='../dataset/', feature_config=None):
+        """
+        :param feature_config: features.py config the folds are trained on; defaults to
+                               DEFAULT_FEATURE_CONFIG with the dataset's hand order, as in modeling.py.
+        """
         self.data_path = data_path
         # Load labels
         with open(os.path.join(data_path, 'labels.json'), 'r', encoding='utf-8') as f:
@@ -22,9 +72,12 @@ class DataAnalyzer:
             numpy_y_file=os.path.join(data_path, 'data_Y.npy')
         )
         
-        # Load data
-        self.data_X = np.load(os.path.join(data_path, 'data_X.npy'), allow_pickle=True)
-        self.data_Y = np.load(os.path.join(data_path, 'data_Y.npy'))
+        # Load data (memory-mapped, float32 (N, 60, 84))
+        self.data_X, self.data_Y = load_dataset(self.dataset.numpy_x_file, self.dataset.numpy_y_file)
+        if feature_config is None:
+            metadata = load_metadata(self.dataset.numpy_x_file) or {}
+            feature_config = {**DEFAULT_FEATURE_CONFIG, 'hand_order': metadata.get('hand_order', 'detection')}
+        self.feature_config = feature_config
 
     def analyze_data_distribution(self):
         """Phân tích phân bố dữ liệu"""
@@ -61,59 +114,69 @@ class DataAnalyzer:
         
         return counts
 
-    def perform_cross_validation(self, k=5, epochs=50):
-        """Thực hiện k-fold cross validation"""
+    def perform_cross_validation(self, k=5, epochs=50, num_workers=1, threads_per_worker=None, patience=5,
+                                 checkpoint_dir='analysis_results/cv_folds'):
+        """
+        Thực hiện k-fold cross validation
+
+        :param num_workers: Folds trained concurrently, each in its own process.
+        :param threads_per_worker: TensorFlow intra-op threads per worker (None = TF default);
+                                   keep num_workers * threads_per_worker <= CPU cores.
+        :param patience: Early stopping patience on val_loss (best weights are restored).
+        :param checkpoint_dir: Folder with one result file per finished fold; folds already
+                               there for the same configuration are skipped on resume.
+        """
         kf = KFold(n_splits=k, shuffle=True, random_state=42)
-        
-        # Reshape data
-        X = np.array(self.data_X, dtype=np.float32).reshape(self.data_X.shape[0], self.data_X.shape[1], -1)
-        y = np.array(self.data_Y, dtype=np.float32)
-        
-        accuracies = []
-        histories = []
-        confusion_matrices = []
-        
-        for fold, (train_idx, val_idx) in enumerate(kf.split(X)):
-            print(f"\nFold {fold + 1}/{k}")
-            
-            # Split data
-            X_train, X_val = X[train_idx], X[val_idx]
-            y_train, y_val = y[train_idx], y[val_idx]
-            
-            # Create and train model
-            model = CNNLSTMModel(
-                input_shape=(X.shape[1], X.shape[2]), 
-                num_classes=len(self.labels)
-            )
-            
-            # Convert to TF dataset
-            train_dataset = tf.data.Dataset.from_tensor_slices((X_train, y_train)).batch(32)
-            val_dataset = tf.data.Dataset.from_tensor_slices((X_val, y_val)).batch(32)
-            
-            # Train
-            history = model.model.fit(
-                train_dataset,
-                validation_data=val_dataset,
-                epochs=epochs,
-                verbose=1
-            )
-            
-            # Evaluate
-            val_pred = np.argmax(model.model.predict(X_val), axis=1)
-            cm = confusion_matrix(y_val, val_pred)
-            
-            accuracies.append(history.history['val_accuracy'][-1])
-            histories.append(history.history)
-            confusion_matrices.append(cm)
-            
-            # Plot confusion matrix for this fold
-            plt.figure(figsize=(10, 8))
-            sns.heatmap(cm, annot=True, fmt='d')
-            plt.title(f'Confusion Matrix - Fold {fold + 1}')
-            plt.xlabel('Predicted')
-            plt.ylabel('True')
-            plt.savefig(f'analysis_results/confusion_matrix_fold_{fold+1}.png')
-            plt.close()
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        os.makedirs('analysis_results', exist_ok=True)
+        config_key = (f"k{k}_epochs{epochs}_patience{patience}_n{len(self.data_Y)}"
+                      f"_features{self.feature_config['version']}-{self.feature_config['hand_order']}")
+
+        results = {}
+        pending = []
+        for fold, (train_idx, val_idx) in enumerate(kf.split(np.arange(len(self.data_Y)))):
+            checkpoint_path = os.path.join(checkpoint_dir, f'fold_{fold + 1}.json')
+            previous = self._load_fold_checkpoint(checkpoint_path, config_key)
+            if previous is not None:
+                print(f"Fold {fold + 1}/{k}: đã có kết quả, bỏ qua")
+                results[fold] = previous
+                continue
+            pending.append({
+                'fold': fold,
+                'config_key': config_key,
+                'checkpoint_path': checkpoint_path,
+                'x_file': self.dataset.numpy_x_file,
+                'y_file': self.dataset.numpy_y_file,
+                'feature_config': self.feature_config,
+                'train_idx': train_idx,
+                'val_idx': val_idx,
+                'num_classes': len(self.labels),
+                'epochs': epochs,
+                'patience': patience,
+                'threads_per_worker': threads_per_worker,
+            })
+
+        if num_workers > 1 and len(pending) > 1:
+            # TensorFlow không an toàn với fork: dùng spawn cho các process con
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=num_workers, mp_context=context) as pool:
+                for result in pool.map(_run_fold, pending):
+                    print(f"Fold {result['fold'] + 1}/{k}: accuracy {result['accuracy']:.4f}")
+                    results[result['fold']] = result
+        else:
+            for fold_config in pending:
+                print(f"\nFold {fold_config['fold'] + 1}/{k}")
+                result = _run_fold(fold_config)
+                results[result['fold']] = result
+
+        accuracies = [results[fold]['accuracy'] for fold in range(k)]
+        histories = [results[fold]['history'] for fold in range(k)]
+        confusion_matrices = [np.array(results[fold]['confusion_matrix']) for fold in range(k)]
+
+        # Plot confusion matrix for each fold and the sum over all folds
+        for fold, cm in enumerate(confusion_matrices):
+            self._plot_confusion_matrix(cm, f'Confusion Matrix - Fold {fold + 1}', f'analysis_results/confusion_matrix_fold_{fold+1}.png')
+        self._plot_confusion_matrix(np.sum(confusion_matrices, axis=0), 'Confusion Matrix - All Folds', 'analysis_results/confusion_matrix_all_folds.png')
 
         # Plot average learning curves
         self._plot_average_learning_curves(histories)
@@ -124,6 +187,23 @@ class DataAnalyzer:
         
         return accuracies, histories, confusion_matrices
 
+    def _load_fold_checkpoint(self, checkpoint_path, config_key):
+        if not os.path.exists(checkpoint_path):
+            return None
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+        # Kết quả của cấu hình khác (k, epochs, dữ liệu) không dùng lại
+        return result if result.get('config') == config_key else None
+
+    def _plot_confusion_matrix(self, cm, title, path):
+        plt.figure(figsize=(10, 8))
+        sns.heatmap(cm, annot=True, fmt='d')
+        plt.title(title)
+        plt.xlabel('Predicted')
+        plt.ylabel('True')
+        plt.savefig(path)
+        plt.close()
+
     def _plot_average_learning_curves(self, histories):
         """Vẽ đường cong học tập trung bình"""
         plt.figure(figsize=(12, 4))
@@ -150,15 +230,17 @@ class DataAnalyzer:
 
     def _plot_learning_curve(self, histories, train_key, val_key):
         """Vẽ đường cong học tập với độ lệch chuẩn"""
-        # Calculate mean and std
-        train_values = np.array([h[train_key] for h in histories])
-        val_values = np.array([h[val_key] for h in histories])
+        # Early stopping cho số epoch khác nhau giữa các fold: đệm NaN rồi tính bỏ qua NaN
+        max_epochs = max(len(h[train_key]) for h in histories)
+        train_values = np.array([h[train_key] + [np.nan] * (max_epochs - len(h[train_key])) for h in histories])
+        val_values = np.array([h[val_key] + [np.nan] * (max_epochs - len(h[val_key])) for h in histories])
         
-        epochs = range(1, len(histories[0][train_key]) + 1)
-        train_mean = np.mean(train_values, axis=0)
-        train_std = np.std(train_values, axis=0)
-        val_mean = np.mean(val_values, axis=0)
-        val_std = np.std(val_values, axis=0)
+        # Calculate mean and std
+        epochs = range(1, max_epochs + 1)
+        train_mean = np.nanmean(train_values, axis=0)
+        train_std = np.nanstd(train_values, axis=0)
+        val_mean = np.nanmean(val_values, axis=0)
+        val_std = np.nanstd(val_values, axis=0)
         
         # Plot mean
         plt.plot(epochs, train_mean, '-')
@@ -177,4 +259,6 @@ if __name__ == "__main__":
     
     # Thực hiện cross-validation
     print("\nĐang thực hiện cross-validation...")
-    accuracies, histories, cms = analyzer.perform_cross_validation(k=5, epochs=50)
\ No newline at end of file
+    accuracies, histories, cms = analyzer.perform_cross_validation(
+        k=5, epochs=50, num_workers=min(5, os.cpu_count() or 1), threads_per_worker=max(1, (os.cpu_count() or 1) // 5)
+    )
\ No newline at end of file
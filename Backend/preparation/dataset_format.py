@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import numpy as np
+
+# Version 1: data_X.npy là mảng float32 liền khối (N, timesteps, features), data_Y.npy là int64 (N,)
+DATASET_FORMAT_VERSION = 1
+
+def metadata_path(x_file):
+    """
+    Path of the JSON metadata stored next to data_X.npy (data_X.meta.json).
+    """
+    return os.path.splitext(str(x_file))[0] + '.meta.json'
+
+def save_dataset(x_file, y_file, data_X, data_Y, **metadata):
+    """
+    Save landmarks in the dense format: a contiguous float32 (N, timesteps, features)
+    array that can be memory-mapped, int64 labels and a versioned metadata file.
+
+    :param data_X: Sequences of shape (N, timesteps, 42, 2) or (N, timesteps, 84), list or array.
+    :param data_Y: Label index per sequence.
+    :param metadata: Extra JSON-serializable fields (frame_size, sampler, ...).
+    """
+    data_X = np.asarray(data_X, dtype=np.float32)
+    data_X = np.ascontiguousarray(data_X.reshape(data_X.shape[0], data_X.shape[1], -1))
+    data_Y = np.asarray(data_Y, dtype=np.int64).reshape(-1)
+    if data_X.shape[0] != data_Y.shape[0]:
+        raise ValueError(f"data_X has {data_X.shape[0]} samples but data_Y has {data_Y.shape[0]}")
+
+    np.save(x_file, data_X)
+    np.save(y_file, data_Y)
+    meta = {
+        'format_version': DATASET_FORMAT_VERSION,
+        'num_samples': int(data_X.shape[0]),
+        'timesteps': int(data_X.shape[1]),
+        'features': int(data_X.shape[2]),
+        'dtype': 'float32',
+        **metadata,
+    }
+    with open(metadata_path(x_file), 'w', encoding='utf-8') as file:
+        json.dump(meta, file, indent=4)
+
+def load_dataset(x_file, y_file, mmap=True):
+    """
+    Load data_X / data_Y as (N, timesteps, features) float32 and (N,) int64.
+
+    Dense files are memory-mapped (zero-copy, pages read on demand). Legacy
+    pickled object arrays are still accepted but converted in memory; run
+    convert_legacy_dataset once to avoid that cost.
+
+    :param mmap: Memory-map dense files instead of reading them into RAM.
+    """
+    mmap_mode = 'r' if mmap else None
+    try:
+        data_X = np.load(x_file, mmap_mode=mmap_mode)
+    except ValueError:
+        # Mảng object (định dạng cũ) chỉ đọc được với allow_pickle=True
+        print(f"Warning: '{x_file}' is a legacy pickled dataset, converting in memory. "
+              f"Run dataset_format.py to convert it once.")
+        data_X = _dense_from_legacy(np.load(x_file, allow_pickle=True))
+
+    if data_X.dtype != np.float32:
+        data_X = np.asarray(data_X, dtype=np.float32)
+    if data_X.ndim == 4:
+        data_X = data_X.reshape(data_X.shape[0], data_X.shape[1], -1)
+
+    data_Y = np.load(y_file, mmap_mode=mmap_mode)
+    return data_X, data_Y.reshape(-1)
+
+def load_metadata(x_file):
+    """
+    :return: Metadata dict, or None for legacy files without one.
+    """
+    path = metadata_path(x_file)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def convert_legacy_dataset(x_file, y_file, output_x_file=None, output_y_file=None):
+    """
+    Rewrite a legacy pickled data_X.npy (object array) in the dense format.
+
+    :param output_x_file: Destination for X (defaults to overwriting `x_file`).
+    :param output_y_file: Destination for Y (defaults to overwriting `y_file`).
+    """
+    data_X = _dense_from_legacy(np.load(x_file, allow_pickle=True))
+    data_Y = np.load(y_file, allow_pickle=True)
+    save_dataset(output_x_file or x_file, output_y_file or y_file, data_X, data_Y, converted_from=os.path.basename(str(x_file)))
+    print(f"Converted {data_X.shape[0]} samples to dense format {data_X.shape} float32")
+
+def _dense_from_legacy(data_X):
+    data_X = np.array(data_X.tolist() if data_X.dtype == object else data_X, dtype=np.float32)
+    return data_X.reshape(data_X.shape[0], data_X.shape[1], -1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a legacy pickled data_X.npy to the dense float32 format")
+    parser.add_argument('--x-file', default='../dataset/data_X.npy')
+    parser.add_argument('--y-file', default='../dataset/data_Y.npy')
+    parser.add_argument('--output-x-file', default=None)
+    parser.add_argument('--output-y-file', default=None)
+    args = parser.parse_args()
+
+    convert_legacy_dataset(args.x_file, args.y_file, args.output_x_file, args.output_y_file)
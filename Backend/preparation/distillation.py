@@ -0,0 +1,185 @@
+import json
+import os
+import numpy as np
+import tensorflow as tf
+from keras.models import Model, Sequential, load_model # type: ignore
+from keras.layers import Input, Conv1D, MaxPooling1D, GRU, Dense, Dropout, BatchNormalization, GlobalAveragePooling1D, Activation, Rescaling # type: ignore
+from keras.losses import KLDivergence # type: ignore
+from keras.optimizers import Adam # type: ignore
+from keras.callbacks import EarlyStopping, ReduceLROnPlateau # type: ignore
+from modeling import CNNLSTMModel, measure_inference_latency
+from dataset_format import load_dataset
+from features import load_feature_config, save_feature_config
+from vsldataset import VSLDataset
+
+STUDENT_KINDS = ('tcn', 'gru')
+
+def build_student_body(kind, input_shape, width=32):
+    """
+    Feature extractor of a compact student; the classification head is added by StudentDistiller.
+
+    'tcn' is a stack of dilated causal Conv1D blocks (receptive field 31 frames)
+    followed by global average pooling. 'gru' is one Conv1D block that halves the
+    sequence and a single unidirectional GRU.
+
+    :param kind: 'tcn' or 'gru'.
+    :param width: Conv filters / GRU units.
+    """
+    if kind == 'tcn':
+        layers = [Input(shape=input_shape)]
+        for dilation_rate in (1, 2, 4, 8):
+            layers += [
+                Conv1D(width, kernel_size=3, dilation_rate=dilation_rate, padding='causal', activation='relu'),
+                BatchNormalization(),
+            ]
+        layers.append(GlobalAveragePooling1D())
+    elif kind == 'gru':
+        layers = [
+            Input(shape=input_shape),
+            Conv1D(width, kernel_size=5, activation='relu', padding='same'),
+            BatchNormalization(),
+            MaxPooling1D(pool_size=2),
+            GRU(width),
+        ]
+    else:
+        raise ValueError(f"Unknown student kind: {kind}")
+    return Sequential(layers + [Dropout(0.2)], name=f'{kind}_body')
+
+class StudentDistiller:
+    def __init__(self, teacher_path='./results/best.keras', data_path='../dataset/', temperature=4.0, alpha=0.7,
+                 train_size=0.7, val_size=0.2):
+        """
+        Train a compact student from the soft outputs of the CNN-LSTM teacher.
+
+        The student minimizes alpha * T^2 * KL(teacher_T || student_T) +
+        (1 - alpha) * cross-entropy with the true labels, where `_T` are the
+        softmax outputs at temperature T. The teacher ends in a softmax, so its
+        tempered distribution is recomputed from the log-probabilities. Splits
+        match VSLDataset.create_datasets so test accuracy is comparable with the teacher.
+
+        :param teacher_path: Saved teacher model (.keras).
+        :param temperature: Softmax temperature of the distillation term.
+        :param alpha: Weight of the distillation term vs. the hard-label term.
+        """
+        self.temperature = temperature
+        self.alpha = alpha
+        with open(os.path.join(data_path, 'labels.json'), 'r', encoding='utf-8') as file:
+            self.labels = json.load(file)
+        self.num_classes = len(self.labels)
+
+        self.teacher = load_model(teacher_path)
+        print(f"Teacher loaded from {teacher_path}")
+        # Student dùng cùng đặc trưng với teacher
+        self.feature_config = load_feature_config(teacher_path)
+
+        dataset = VSLDataset(os.path.join(data_path, 'data_X.npy'), os.path.join(data_path, 'data_Y.npy'))
+        _, data_Y = load_dataset(dataset.numpy_x_file, dataset.numpy_y_file)
+        # Cùng cách chia với VSLDataset.create_datasets (tập test của teacher)
+        split_ids = VSLDataset.split_indices(len(data_Y), train_size, val_size)
+        self.splits = {}
+        for name, idx in zip(('train', 'val', 'test'), split_ids):
+            split_X, split_Y = dataset.load_features(idx, self.feature_config)
+            self.splits[name] = (split_X, split_Y.astype(np.int64))
+        self.input_shape = self.splits['train'][0].shape[1:]
+
+    def soft_targets(self, data_X):
+        """
+        Teacher distribution at `temperature`, computed in batches.
+        """
+        probs = self.teacher.predict(data_X, batch_size=256, verbose=0)
+        logits = np.log(np.clip(probs, 1e-8, 1.0)) / self.temperature
+        logits -= logits.max(axis=1, keepdims=True)
+        soft = np.exp(logits)
+        return (soft / soft.sum(axis=1, keepdims=True)).astype(np.float32)
+
+    def train(self, kind='tcn', width=32, epochs=100, patience=10, batch_size=32, learning_rate=0.001,
+              results_dir='results', student_path='student.keras'):
+        """
+        :param kind: Student architecture, see build_student_body.
+        :return: The serving student (softmax output, same input/output as the teacher).
+        """
+        os.makedirs(results_dir, exist_ok=True)
+
+        inputs = Input(shape=self.input_shape)
+        logits = Dense(self.num_classes, name='logits')(build_student_body(kind, self.input_shape, width)(inputs))
+        probs = Activation('softmax', dtype='float32', name='probs')(logits)
+        soft = Activation('softmax', dtype='float32', name='soft')(Rescaling(1.0 / self.temperature)(logits))
+
+        # Model huấn luyện có hai đầu ra; model phục vụ dùng chung các lớp và chỉ giữ đầu ra softmax
+        trainer = Model(inputs, {'probs': probs, 'soft': soft})
+        student = Model(inputs, probs, name=f'{kind}_student')
+        trainer.compile(
+            optimizer=Adam(learning_rate=learning_rate, clipnorm=1.0),
+            loss={'probs': 'sparse_categorical_crossentropy', 'soft': KLDivergence()},
+            loss_weights={'probs': 1.0 - self.alpha, 'soft': self.alpha * self.temperature ** 2},
+            metrics={'probs': 'accuracy'}
+        )
+
+        def dataset(split, shuffle):
+            data_X, data_Y = self.splits[split]
+            targets = {'probs': data_Y.astype(np.float32), 'soft': self.soft_targets(data_X)}
+            ds = tf.data.Dataset.from_tensor_slices((data_X, targets))
+            if shuffle:
+                ds = ds.shuffle(len(data_Y))
+            return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+        print(f"Distilling a '{kind}' student (T={self.temperature}, alpha={self.alpha})...")
+        trainer.fit(
+            dataset('train', shuffle=True),
+            validation_data=dataset('val', shuffle=False),
+            epochs=epochs,
+            verbose=2,
+            callbacks=[
+                EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True, mode='min'),
+                ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=3, min_lr=1e-6, verbose=1),
+            ]
+        )
+
+        student_path = os.path.join(results_dir, student_path)
+        student.save(student_path)
+        save_feature_config(student_path, self.feature_config)
+        print(f"Student saved as '{student_path}'")
+        return student
+
+    def report(self, student, results_dir='results', latency_repeats=200):
+        """
+        Compare teacher and student on the test split: accuracy, agreement with
+        the teacher, parameter count and single-window CPU latency.
+        """
+        test_X, test_Y = self.splits['test']
+        teacher_pred = np.argmax(self.teacher.predict(test_X, batch_size=256, verbose=0), axis=1)
+        student_pred = np.argmax(student.predict(test_X, batch_size=256, verbose=0), axis=1)
+
+        report = {'temperature': self.temperature, 'alpha': self.alpha, 'num_test_samples': int(len(test_Y))}
+        for name, model, pred in (('teacher', self.teacher, teacher_pred), ('student', student, student_pred)):
+            median_ms, p95_ms = measure_inference_latency(model, repeats=latency_repeats)
+            report[name] = {
+                'accuracy': float(np.mean(pred == test_Y)),
+                'num_params': int(model.count_params()),
+                'latency_ms': median_ms,
+                'latency_p95_ms': p95_ms,
+            }
+        report['agreement'] = float(np.mean(teacher_pred == student_pred))
+        report['speedup'] = report['teacher']['latency_ms'] / report['student']['latency_ms']
+
+        report_path = os.path.join(results_dir, 'distillation_report.json')
+        with open(report_path, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=4)
+
+        print(f"\n{'Model':<10}{'Accuracy':>10}{'Params':>10}{'Latency (ms)':>14}{'p95 (ms)':>10}")
+        for name in ('teacher', 'student'):
+            row = report[name]
+            print(f"{name:<10}{row['accuracy']*100:>9.2f}%{row['num_params']:>10}{row['latency_ms']:>14.2f}{row['latency_p95_ms']:>10.2f}")
+        print(f"Agreement: {report['agreement']*100:.2f}% | Speedup: {report['speedup']:.2f}x")
+        print(f"Report saved to '{report_path}'")
+        return report
+
+if __name__ == "__main__":
+    distiller = StudentDistiller(teacher_path='./results/best.keras', data_path='../dataset/')
+    student = distiller.train(kind='tcn', epochs=1000, patience=10, results_dir='./results', student_path='student.keras')
+    distiller.report(student, results_dir='./results')
+
+    # Xuất TFLite cho student (server: VSL_MODEL_PATH=./preparation/results/student.keras, VSL_INFERENCE_BACKEND=tflite)
+    student_model = CNNLSTMModel(input_shape=distiller.input_shape, num_classes=distiller.num_classes)
+    student_model.load_model_from_file('./results/student.keras')
+    student_model.export_tflite('./results/student.tflite')
@@ -0,0 +1,151 @@
+import json
+import os
+import numpy as np
+
+POINTS_PER_HAND = 21
+NUM_POINTS = 2 * POINTS_PER_HAND
+WRIST = 0
+MIDDLE_MCP = 9
+
+# Version 0: tọa độ ảnh thô (84 giá trị mỗi frame), dùng cho các model cũ không có file cấu hình
+# Version 1: tọa độ tương đối cổ tay, chuẩn hóa theo kích thước lòng bàn tay, vị trí cổ tay, cờ có tay và vận tốc
+FEATURE_VERSION = 1
+HAND_ORDERS = ('detection', 'handedness')
+
+LEGACY_FEATURE_CONFIG = {'version': 0, 'hand_order': 'detection'}
+DEFAULT_FEATURE_CONFIG = {
+    'version': FEATURE_VERSION,
+    'hand_order': 'handedness',
+    'wrist_relative': True,
+    'scale_normalize': True,
+    'velocity': True,
+}
+
+def missing_landmarks():
+    """
+    Landmarks of a frame without hands: 42 [-1, -1] points.
+    """
+    return np.full((NUM_POINTS, 2), -1, dtype=np.float32)
+
+def extract_landmarks(results, hand_order='handedness', out=None):
+    """
+    Convert a MediaPipe Hands result to a (42, 2) array of [x, y] image coordinates.
+
+    With 'handedness' the left hand always goes to slot 0 (points 0-20) and the
+    right hand to slot 1 (points 21-41), using MediaPipe's handedness label; if
+    both hands get the same label the detection order is kept. 'detection'
+    fills the slots in detection order (the original dataset layout), so a
+    single hand is always in slot 0. Missing points are -1.
+
+    The handedness label depends on whether the image is mirrored, so training
+    videos and served frames must use the same orientation.
+
+    :param results: Output of mp.solutions.hands.Hands.process.
+    :param hand_order: 'handedness' or 'detection'.
+    :param out: Optional float32 (42, 2) array (e.g. a row of a preallocated buffer)
+                written in place instead of allocating a new one.
+    :return: `out`, or a new (42, 2) array.
+    """
+    if hand_order not in HAND_ORDERS:
+        raise ValueError(f"Unknown hand order: {hand_order}")
+
+    if out is None:
+        landmarks = missing_landmarks()
+    else:
+        landmarks = out
+        landmarks.fill(-1)
+    hands = list(results.multi_hand_landmarks or [])[:2]
+    slots = list(range(len(hands)))
+    handedness = results.multi_handedness or []
+    if hand_order == 'handedness' and len(handedness) >= len(hands):
+        labeled = [0 if handedness[i].classification[0].label == 'Left' else 1 for i in range(len(hands))]
+        if len(set(labeled)) == len(labeled):
+            slots = labeled
+
+    for slot, hand_landmarks in zip(slots, hands):
+        hand_points = landmarks[slot * POINTS_PER_HAND:(slot + 1) * POINTS_PER_HAND]
+        for point, lm in zip(hand_points, hand_landmarks.landmark):
+            point[0] = lm.x
+            point[1] = lm.y
+    return landmarks
+
+def compute_features(landmarks, config=DEFAULT_FEATURE_CONFIG):
+    """
+    Vectorized feature transform shared by training and serving.
+
+    For every hand slot and frame (version 1):
+      - the 21 points relative to the wrist, divided by the wrist -> middle MCP
+        distance (position and camera-distance invariant),
+      - the wrist position in the image (keeps the global hand motion),
+      - a presence flag,
+      - the frame-to-frame velocity of the above coordinates (0 when the hand
+        is missing in either frame).
+    Missing hands are encoded as zeros plus presence 0 instead of the -1 sentinel.
+
+    :param landmarks: Raw coordinates of shape (..., timesteps, 84) or (..., timesteps, 42, 2), -1 for missing points.
+    :param config: Feature config; version 0 returns the raw coordinates.
+    :return: float32 array of shape (..., timesteps, feature_dim(config)).
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    if landmarks.shape[-1] != 2:
+        landmarks = landmarks.reshape(landmarks.shape[:-1] + (NUM_POINTS, 2))
+    leading = landmarks.shape[:-2]
+
+    version = config.get('version', 0)
+    if version == 0:
+        return landmarks.reshape(leading + (NUM_POINTS * 2,))
+    if version > FEATURE_VERSION:
+        raise ValueError(f"Feature version {version} is newer than this code ({FEATURE_VERSION})")
+
+    points = landmarks.reshape(leading + (2, POINTS_PER_HAND, 2))
+    present = np.all(points != -1, axis=(-1, -2))  # (..., timesteps, 2)
+
+    wrist = points[..., WRIST:WRIST + 1, :]
+    coords = points - wrist if config.get('wrist_relative', True) else points
+    if config.get('scale_normalize', True):
+        palm_size = np.linalg.norm(points[..., MIDDLE_MCP, :] - points[..., WRIST, :], axis=-1)
+        coords = coords / np.maximum(palm_size, 1e-6)[..., np.newaxis, np.newaxis]
+
+    parts = [coords.reshape(leading + (2, NUM_POINTS))]
+    if config.get('wrist_relative', True):
+        parts.append(wrist[..., 0, :])
+    position = np.concatenate(parts, axis=-1)
+    position = np.where(present[..., np.newaxis], position, 0.0)
+
+    hand_features = [position, present[..., np.newaxis].astype(np.float32)]
+    if config.get('velocity', True):
+        velocity = np.zeros_like(position)
+        velocity[..., 1:, :, :] = position[..., 1:, :, :] - position[..., :-1, :, :]
+        both_present = np.zeros_like(present)
+        both_present[..., 1:, :] = present[..., 1:, :] & present[..., :-1, :]
+        hand_features.append(np.where(both_present[..., np.newaxis], velocity, 0.0))
+
+    features = np.concatenate(hand_features, axis=-1)  # (..., timesteps, 2, per_hand)
+    return features.reshape(leading + (-1,)).astype(np.float32)
+
+def feature_dim(config=DEFAULT_FEATURE_CONFIG):
+    """
+    Number of features per frame produced by compute_features with `config`.
+    """
+    return compute_features(missing_landmarks()[np.newaxis], config).shape[-1]
+
+def feature_config_path(model_path):
+    """
+    Path of the feature config stored next to a model (best.keras -> best.features.json).
+    """
+    return os.path.splitext(str(model_path))[0] + '.features.json'
+
+def save_feature_config(model_path, config):
+    with open(feature_config_path(model_path), 'w', encoding='utf-8') as file:
+        json.dump(config, file, indent=4)
+
+def load_feature_config(model_path):
+    """
+    :return: The feature config saved with the model, or LEGACY_FEATURE_CONFIG
+             (raw coordinates, detection order) for models trained before it existed.
+    """
+    path = feature_config_path(model_path)
+    if not os.path.exists(path):
+        return dict(LEGACY_FEATURE_CONFIG)
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
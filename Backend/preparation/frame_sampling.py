@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+
+SAMPLING_STRATEGIES = ('sequential', 'seek')
+
+def sample_video_frames(video_path, num_frames, strategy='sequential'):
+    """
+    Sample `num_frames` evenly spaced RGB frames from a video.
+
+    'sequential' decodes the file once from the start: skipped frames are only
+    grabbed (demuxed and decoded, no colour conversion or copy) and sampled ones
+    are retrieved. 'seek' sets CAP_PROP_POS_FRAMES before each read, which forces
+    a keyframe seek and re-decode per sample and is usually slower for short clips.
+
+    :param video_path: Path to the video file.
+    :param num_frames: Number of frames to return.
+    :param strategy: 'sequential' or 'seek'.
+    :return: List of `num_frames` RGB frames, None where a frame can't be read.
+    """
+    if strategy not in SAMPLING_STRATEGIES:
+        raise ValueError(f"Unknown sampling strategy: {strategy}")
+
+    cap = cv2.VideoCapture(str(video_path))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frame_indices = np.linspace(0, total_frames - 1, num_frames, dtype=int)
+
+    if strategy == 'seek':
+        frames = _sample_by_seeking(cap, frame_indices)
+    else:
+        frames = _sample_sequentially(cap, frame_indices)
+    cap.release()
+
+    # If there are fewer frames than expected, add blank frames
+    while len(frames) < num_frames:
+        frames.append(None)
+    return frames
+
+def _sample_by_seeking(cap, frame_indices):
+    frames = []
+    for idx in frame_indices:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+        ret, frame = cap.read()
+        if ret:
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        else:
+            frames.append(None)  # Add None if frame can't be read
+    return frames
+
+def _sample_sequentially(cap, frame_indices):
+    frames = []
+    position = -1  # Chỉ số của frame vừa grab
+    last_frame = None
+    for idx in frame_indices:
+        # Video ngắn hơn num_frames: linspace lặp lại chỉ số, dùng lại frame trước
+        if idx == position:
+            frames.append(last_frame)
+            continue
+
+        grabbed = True
+        while position < idx:
+            grabbed = cap.grab()
+            if not grabbed:
+                break
+            position += 1
+
+        last_frame = None
+        if grabbed and position == idx:
+            ret, frame = cap.retrieve()
+            if ret:
+                last_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        frames.append(last_frame)
+    return frames
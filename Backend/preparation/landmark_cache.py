@@ -0,0 +1,64 @@
+import hashlib
+import json
+import numpy as np
+from pathlib import Path
+
+class LandmarkCache:
+    def __init__(self, cache_dir, settings):
+        """
+        On-disk cache of per-video hand landmarks.
+
+        Entries are keyed by the SHA-256 of the video content plus a hash of the
+        extraction settings (MediaPipe options, frame_size, ...), so renamed files
+        still hit and changing a setting invalidates every entry.
+
+        :param cache_dir: Folder holding one .npy file per video.
+        :param settings: JSON-serializable dict of everything that affects extraction.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        settings_json = json.dumps(settings, sort_keys=True)
+        self.settings_hash = hashlib.sha256(settings_json.encode('utf-8')).hexdigest()[:16]
+
+    def key_for(self, video_path):
+        """
+        Cache key of a video: content hash + settings hash.
+        """
+        sha = hashlib.sha256()
+        with open(video_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                sha.update(chunk)
+        return f"{sha.hexdigest()}_{self.settings_hash}"
+
+    def load(self, key):
+        """
+        :return: Cached coordinates array of shape (frames, 42, 2), or None on a miss.
+        """
+        path = self._path(key)
+        if not path.exists():
+            return None
+        return np.load(path)
+
+    def save(self, key, coordinates):
+        # Ghi ra file tạm rồi đổi tên để không để lại entry hỏng nếu bị ngắt giữa chừng
+        path = self._path(key)
+        tmp_path = path.with_name(path.stem + '.tmp.npy')
+        np.save(tmp_path, np.asarray(coordinates, dtype=np.float32))
+        tmp_path.replace(path)
+
+    def prune(self, keep_keys):
+        """
+        Delete every entry not in `keep_keys` (removed videos, old settings).
+
+        :return: Number of deleted entries.
+        """
+        keep_names = {self._path(key).name for key in keep_keys}
+        removed = 0
+        for path in self.cache_dir.glob('*.npy'):
+            if path.name not in keep_names:
+                path.unlink()
+                removed += 1
+        return removed
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.npy"
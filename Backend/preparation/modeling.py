@@ -8,47 +8,108 @@ from keras.optimizers import Adam # type: ignore
 from keras.callbacks import EarlyStopping, ModelCheckpoint # type: ignore
 import matplotlib.pyplot as plt
 import os
+import time
 from keras.models import load_model # type: ignore
 from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
 from keras.layers import BatchNormalization, Bidirectional # type: ignore
-from keras.callbacks import ReduceLROnPlateau # type: ignore
+from keras.callbacks import ReduceLROnPlateau, Callback # type: ignore
+
+# Kiến trúc mặc định (model đang dùng cho server); mỗi conv block gồm Conv1D + BatchNorm + MaxPool
+DEFAULT_ARCHITECTURE = {
+    'conv_filters': (32, 64),
+    'kernel_sizes': (5, 3),
+    'lstm_units': (64, 32),
+    'bidirectional': True,
+    'dense_units': 64,
+    'dropout': 0.3,
+}
+
+class EpochTimer(Callback):
+    def __init__(self, batch_size):
+        """
+        Record wall-clock time and throughput of every training epoch.
+
+        :param batch_size: Samples per batch; throughput counts every batch as full.
+        """
+        super().__init__()
+        self.batch_size = batch_size
+        self.epoch_times = []
+        self.samples_per_sec = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+        self._batches = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._batches += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._start
+        self.epoch_times.append(elapsed)
+        self.samples_per_sec.append(self._batches * self.batch_size / elapsed)
+        print(f"Epoch {epoch + 1}: {elapsed:.2f}s, {self.samples_per_sec[-1]:.0f} samples/sec")
 
 class CNNLSTMModel:
-    def __init__(self, input_shape, num_classes):
+    def __init__(self, input_shape, num_classes, learning_rate=0.0001, batch_size=32, base_batch_size=32,
+                 jit_compile=False, mixed_precision=None, architecture=None):
+        """
+        :param learning_rate: Learning rate for `base_batch_size`; scaled linearly when
+                              training with a larger `batch_size`.
+        :param batch_size: Batch size the datasets are built with (used for LR scaling and throughput).
+        :param jit_compile: Compile the train/predict steps with XLA.
+        :param mixed_precision: None (float32), 'mixed_float16' (with loss scaling) or
+                                'mixed_bfloat16'; the softmax output always stays float32.
+        :param architecture: Overrides for DEFAULT_ARCHITECTURE (conv_filters, kernel_sizes,
+                             lstm_units, bidirectional, dense_units, dropout).
+        """
         self.input_shape = input_shape
         self.num_classes = num_classes
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate * batch_size / base_batch_size
+        self.jit_compile = jit_compile
+        self.mixed_precision = mixed_precision
+        self.architecture = {**DEFAULT_ARCHITECTURE, **(architecture or {})}
+        if not self.architecture['conv_filters'] or len(self.architecture['conv_filters']) != len(self.architecture['kernel_sizes']):
+            raise ValueError("conv_filters and kernel_sizes must be non-empty and have the same length")
         self.model = self._build_model()
 
     def _build_model(self):
-        model = Sequential([
-            # Block 1: Xử lý đặc trưng thời gian
-            Conv1D(32, kernel_size=5, activation='relu', padding='same', input_shape=self.input_shape),
-            BatchNormalization(),
-            MaxPooling1D(pool_size=2),
-            
-            # Block 2: Trích xuất đặc trưng chi tiết
-            Conv1D(64, kernel_size=3, activation='relu', padding='same'),
-            BatchNormalization(),
-            MaxPooling1D(pool_size=2),
-            
-            # Block 3: Xử lý chuỗi thời gian
-            Bidirectional(LSTM(64, return_sequences=True)),
-            Bidirectional(LSTM(32)),
-            
-            # Block 4: Phân loại
-            Dense(64, activation='relu'),
-            BatchNormalization(),
-            Dropout(0.3),
-            Dense(self.num_classes, activation='softmax')
-        ])
+        dtype = self.mixed_precision
+        arch = self.architecture
+        model = Sequential()
+
+        # Block 1-2: Xử lý và trích xuất đặc trưng thời gian
+        for i, (filters, kernel_size) in enumerate(zip(arch['conv_filters'], arch['kernel_sizes'])):
+            if i == 0:
+                model.add(Conv1D(filters, kernel_size=kernel_size, activation='relu', padding='same', input_shape=self.input_shape, dtype=dtype))
+            else:
+                model.add(Conv1D(filters, kernel_size=kernel_size, activation='relu', padding='same', dtype=dtype))
+            model.add(BatchNormalization(dtype=dtype))
+            model.add(MaxPooling1D(pool_size=2, dtype=dtype))
+
+        # Block 3: Xử lý chuỗi thời gian
+        lstm_units = arch['lstm_units']
+        for i, units in enumerate(lstm_units):
+            lstm = LSTM(units, return_sequences=i < len(lstm_units) - 1, dtype=dtype)
+            model.add(Bidirectional(lstm, dtype=dtype) if arch['bidirectional'] else lstm)
+
+        # Block 4: Phân loại
+        model.add(Dense(arch['dense_units'], activation='relu', dtype=dtype))
+        model.add(BatchNormalization(dtype=dtype))
+        model.add(Dropout(arch['dropout'], dtype=dtype))
+        # Softmax giữ float32 để ổn định số học khi dùng mixed precision
+        model.add(Dense(self.num_classes, activation='softmax', dtype='float32'))
 
         # Sử dụng optimizer với learning rate thấp hơn và gradient clipping
-        optimizer = Adam(learning_rate=0.0001, clipnorm=1.0)
+        optimizer = Adam(learning_rate=self.learning_rate, clipnorm=1.0)
+        if self.mixed_precision == 'mixed_float16':
+            optimizer = _loss_scale_optimizer(optimizer)
         
         model.compile(
             optimizer=optimizer,
             loss='sparse_categorical_crossentropy',
-            metrics=['accuracy']
+            metrics=['accuracy'],
+            jit_compile=self.jit_compile
         )
         
         return model
@@ -74,7 +135,8 @@ class CNNLSTMModel:
             verbose=1
         )
         
-        callbacks = [early_stopping, model_checkpoint, reduce_lr]
+        epoch_timer = EpochTimer(self.batch_size)
+        callbacks = [early_stopping, model_checkpoint, reduce_lr, epoch_timer]
         
         # Train the model
         print("Training the model...")
@@ -88,6 +150,14 @@ class CNNLSTMModel:
 
         print(f"Training complete. Best model saved as '{model_path}'")
 
+        # Epoch đầu gồm cả thời gian biên dịch (XLA), nên tính trung bình từ epoch thứ hai
+        history.history['epoch_time'] = epoch_timer.epoch_times
+        history.history['samples_per_sec'] = epoch_timer.samples_per_sec
+        steady_times = epoch_timer.epoch_times[1:] or epoch_timer.epoch_times
+        steady_throughput = epoch_timer.samples_per_sec[1:] or epoch_timer.samples_per_sec
+        print(f"Mean epoch time: {np.mean(steady_times):.2f}s, throughput: {np.mean(steady_throughput):.0f} samples/sec "
+              f"(jit_compile={self.jit_compile}, mixed_precision={self.mixed_precision}, batch_size={self.batch_size})")
+
         # Save training history
         history_path = os.path.join(results_dir, 'training_history.npy')
         np.save(history_path, history.history)
@@ -164,6 +234,162 @@ class CNNLSTMModel:
             'confusion_matrix': cm
         }
 
+    def export_tflite(self, output_path, quantization=None, representative_data=None):
+        """
+        Export the model to TFLite for the lightweight TFLiteBackend.
+
+        The graph is traced with a fixed batch of 1 so the LSTMs are converted to
+        fused TFLite builtins and the file runs on `tflite_runtime` alone;
+        TFLiteBackend runs larger batches window by window. The exported file is
+        invoked once before returning (see _verify_export).
+
+        :param output_path: Path of the .tflite file to write.
+        :param quantization: None (float32), 'dynamic' (int8 weights), 'float16'
+                             (float16 weights) or 'int8' (full integer, int8 input/output).
+        :param representative_data: Iterable of (timesteps, features) sequences used to
+                                    calibrate activations; required for 'int8'.
+        :return: The output path.
+        """
+        timesteps, features = self.input_shape
+        model = self.model
+        forward = tf.function(lambda batch_X: model(batch_X, training=False))
+        concrete_function = forward.get_concrete_function(tf.TensorSpec((1, timesteps, features), tf.float32))
+
+        # Không truyền model làm trackable: biến sẽ bị giữ dạng READ_VARIABLE và file không chạy được
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete_function])
+        if quantization is not None:
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if quantization == 'float16':
+            converter.target_spec.supported_types = [tf.float16]
+        elif quantization == 'int8':
+            if representative_data is None:
+                raise ValueError("Full int8 quantization requires representative_data")
+            converter.representative_dataset = lambda: (
+                [np.asarray(sequence, dtype=np.float32).reshape(1, timesteps, features)]
+                for sequence in representative_data
+            )
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.int8
+            converter.inference_output_type = tf.int8
+        elif quantization not in (None, 'dynamic'):
+            raise ValueError(f"Unknown quantization mode: {quantization}")
+        tflite_model = converter.convert()
+
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with open(output_path, 'wb') as file:
+            file.write(tflite_model)
+        print(f"TFLite model exported to '{output_path}' ({len(tflite_model) / 1024:.1f} KB)")
+        sample = next(iter(representative_data), None) if representative_data is not None else None
+        self._verify_export(output_path, 'tflite', quantization, sample)
+        return output_path
+
+    def _verify_export(self, model_path, kind, quantization=None, sample=None, tolerance=1e-4):
+        """
+        Round trip: run the exported file through its inference backend, as the server does.
+
+        A batch of two windows is used so the batching path is exercised too.
+        Raises RuntimeError if the file does not run, returns the wrong shape or
+        (for float32 exports) differs from the Keras model by more than `tolerance`.
+
+        :param kind: Backend of the file, 'tflite' or 'onnx' (see inference_backends.create_backend).
+        """
+        try:
+            from Backend.services.inference_backends import create_backend
+        except ImportError:
+            import sys
+            sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+            from Backend.services.inference_backends import create_backend
+
+        name = {'tflite': 'TFLite', 'onnx': 'ONNX'}[kind]
+        timesteps, features = self.input_shape
+        if sample is None:
+            sample = np.random.default_rng(0).uniform(0, 1, (timesteps, features))
+        batch_X = np.repeat(np.asarray(sample, dtype=np.float32).reshape(1, timesteps, features), 2, axis=0)
+        try:
+            output = np.asarray(create_backend(kind, model_path, num_threads=1).predict_proba_batch(batch_X))
+        except (RuntimeError, ValueError) as e:
+            raise RuntimeError(f"Exported {name} model '{model_path}' failed to run: {e}") from e
+
+        if output.shape != (2, self.num_classes):
+            raise RuntimeError(f"Exported {name} model returned shape {output.shape}, expected (2, {self.num_classes})")
+        if quantization is None:
+            difference = float(np.max(np.abs(output - self.model(batch_X, training=False).numpy())))
+            if difference > tolerance:
+                raise RuntimeError(f"Exported {name} model differs from Keras by {difference:.2e}")
+            print(f"{name} round trip OK (max difference {difference:.2e})")
+        else:
+            print(f"{name} round trip OK")
+
+    def export_onnx(self, output_path, opset=13):
+        """
+        Export the model to ONNX for the ONNXBackend (requires tf2onnx; the file is
+        checked with onnxruntime before returning, see _verify_export).
+
+        tf2onnx's from_keras does not support Keras 3 models, so the forward pass
+        is wrapped in a tf.function with a dynamic batch dimension and converted
+        with from_function.
+
+        :param output_path: Path of the .onnx file to write.
+        :param opset: ONNX opset version.
+        :return: The output path.
+        """
+        try:
+            import tf2onnx
+        except ImportError as e:
+            raise ImportError("tf2onnx is required for ONNX export: pip install tf2onnx") from e
+
+        timesteps, features = self.input_shape
+        model = self.model
+        input_signature = (tf.TensorSpec((None, timesteps, features), tf.float32, name='input'),)
+        forward = tf.function(lambda batch_X: model(batch_X, training=False), input_signature=input_signature)
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        tf2onnx.convert.from_function(forward, input_signature=input_signature, opset=opset, output_path=output_path)
+        print(f"ONNX model exported to '{output_path}'")
+        self._verify_export(output_path, 'onnx')
+        return output_path
+
+    def check_tflite_parity(self, tflite_path, test_dataset, max_accuracy_drop=0.005):
+        """
+        Compare an exported TFLite model against this Keras model on the test split.
+
+        :param tflite_path: Path to the exported .tflite file.
+        :param test_dataset: Batched dataset of (sequences, labels).
+        :param max_accuracy_drop: Largest accepted accuracy loss of the exported model.
+        :return: Dict with both accuracies, prediction agreement, max probability
+                 difference and whether the export passes.
+        """
+        interpreter = tf.lite.Interpreter(model_path=tflite_path)
+        interpreter.allocate_tensors()
+        input_details = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()[0]
+
+        keras_probs, tflite_probs, true_classes = [], [], []
+        for batch_X, batch_y in test_dataset:
+            batch_X = batch_X.numpy().astype(np.float32)
+            keras_probs.append(self.model.predict_on_batch(batch_X))
+            for sequence in batch_X:
+                interpreter.set_tensor(input_details['index'], sequence[np.newaxis])
+                interpreter.invoke()
+                tflite_probs.append(interpreter.get_tensor(output_details['index'])[0].copy())
+            true_classes.append(batch_y.numpy().reshape(-1))
+
+        keras_probs = np.concatenate(keras_probs, axis=0)
+        tflite_probs = np.stack(tflite_probs).astype(np.float32)
+        true_classes = np.concatenate(true_classes).astype(int)
+
+        keras_accuracy = float(np.mean(np.argmax(keras_probs, axis=1) == true_classes))
+        tflite_accuracy = float(np.mean(np.argmax(tflite_probs, axis=1) == true_classes))
+        results = {
+            'keras_accuracy': keras_accuracy,
+            'tflite_accuracy': tflite_accuracy,
+            'agreement': float(np.mean(np.argmax(keras_probs, axis=1) == np.argmax(tflite_probs, axis=1))),
+            'max_abs_diff': float(np.max(np.abs(keras_probs - tflite_probs))),
+        }
+        results['passed'] = keras_accuracy - tflite_accuracy <= max_accuracy_drop
+        print(f"Keras: {keras_accuracy*100:.2f}% | TFLite: {tflite_accuracy*100:.2f}% | "
+              f"Agreement: {results['agreement']*100:.2f}% | Max diff: {results['max_abs_diff']:.2e}")
+        return results
+
     def load_model_from_file(self, model_path):
         """
         Load a trained model from the specified file path.
@@ -177,23 +403,82 @@ class CNNLSTMModel:
         else:
             print(f"Model file not found at {model_path}")
 
+def set_tf_threads(threads):
+    """
+    Pin TensorFlow's CPU thread pools, e.g. in training / benchmark worker processes.
+
+    :param threads: Intra-op threads (inter-op gets half); None or 0 keeps the defaults.
+    """
+    if threads:
+        # Phải đặt trước khi TensorFlow chạy phép tính đầu tiên trong process
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(max(1, threads // 2))
+
+def measure_inference_latency(keras_model, repeats=200, warmup=10):
+    """
+    Single-window CPU latency through a batch-1 tf.function, the same path the
+    server's fast path uses (model.predict adds several ms of overhead per call).
+
+    :param keras_model: Keras model with input (None, timesteps, features).
+    :return: (median_ms, p95_ms)
+    """
+    timesteps, features = keras_model.input_shape[1], keras_model.input_shape[2]
+    predict = tf.function(lambda x: keras_model(x, training=False),
+                          input_signature=[tf.TensorSpec((1, timesteps, features), tf.float32)])
+    window = tf.constant(np.random.rand(1, timesteps, features).astype(np.float32))
+    for _ in range(warmup):
+        predict(window)
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(window).numpy()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings)), float(np.percentile(timings, 95))
+
+def _loss_scale_optimizer(optimizer):
+    # Keras 3 đặt LossScaleOptimizer trong keras.optimizers, Keras 2 trong keras.mixed_precision
+    try:
+        from keras.optimizers import LossScaleOptimizer # type: ignore
+    except ImportError:
+        from keras.mixed_precision import LossScaleOptimizer # type: ignore
+    return LossScaleOptimizer(optimizer)
+
 if __name__ == "__main__":
     from vsldataset import VSLDataset
+    from augmentation import LandmarkAugmenter
+    from dataset_format import load_metadata
+    from features import DEFAULT_FEATURE_CONFIG, feature_dim, save_feature_config
 
     with open('../dataset/labels.json', 'r', encoding='utf-8') as file:
         labels_json = json.load(file)
     
-    # Load the dataset
+    # Cấu hình huấn luyện: bật XLA / mixed precision / batch lớn để so sánh thời gian mỗi epoch
+    batch_size = 32
+    jit_compile = False
+    mixed_precision = None  # 'mixed_float16' (GPU) hoặc 'mixed_bfloat16' (CPU/TPU hỗ trợ bf16)
+
+    # Đặc trưng chuẩn hóa (features.py); thứ tự bàn tay phải trùng với lúc tạo dataset
+    metadata = load_metadata('../dataset/data_X.npy') or {}
+    feature_config = {**DEFAULT_FEATURE_CONFIG, 'hand_order': metadata.get('hand_order', 'detection')}
+
+    # Load the dataset (tăng cường dữ liệu trực tiếp trên tọa độ thay cho augmented_data)
     dataset = VSLDataset(numpy_x_file='../dataset/data_X.npy', numpy_y_file='../dataset/data_Y.npy')
-    train_dataset, val_dataset, test_dataset = dataset.create_datasets(train_size=0.7, val_size=0.2, batch_size=32)
+    train_dataset, val_dataset, test_dataset = dataset.create_datasets(
+        train_size=0.7, val_size=0.2, batch_size=batch_size,
+        augment=LandmarkAugmenter(hand_order=feature_config['hand_order']), feature_config=feature_config
+    )
 
     # Define input shape and number of classes
-    input_shape = (60, 84)  # (timesteps, features)
+    input_shape = (60, feature_dim(feature_config))  # (timesteps, features)
     num_classes = len(labels_json)
 
     # Create and train the CNN-LSTM model
-    cnn_lstm_model = CNNLSTMModel(input_shape, num_classes)
+    cnn_lstm_model = CNNLSTMModel(input_shape, num_classes, batch_size=batch_size,
+                                  jit_compile=jit_compile, mixed_precision=mixed_precision)
     history = cnn_lstm_model.train(train_dataset, validation_dataset=val_dataset, epochs=1000, patience=5, model_path='best.keras', results_dir='./results')
+    # Lưu cấu hình đặc trưng cạnh model để server tính đúng đặc trưng (best.features.json)
+    save_feature_config('./results/best.keras', feature_config)
 
     # Evaluate and save confusion matrix
     cnn_lstm_model.evaluate_and_save_confusion_matrix(test_dataset, results_dir='./results_2')
@@ -206,4 +491,10 @@ if __name__ == "__main__":
 
     # In ma trận nhầm lẫn
     print("\nMa trận nhầm lẫn:")
-    print(test_results['confusion_matrix'])
\ No newline at end of file
+    print(test_results['confusion_matrix'])
+
+    # Xuất model TFLite cho backend suy luận nhẹ và kiểm tra độ chính xác tương đương
+    tflite_path = cnn_lstm_model.export_tflite('./results/best.tflite')
+    parity = cnn_lstm_model.check_tflite_parity(tflite_path, test_dataset)
+    if not parity['passed']:
+        print("Cảnh báo: model TFLite giảm độ chính xác so với model Keras")
\ No newline at end of file
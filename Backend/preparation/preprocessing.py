@@ -4,18 +4,117 @@ import numpy as np
 import tensorflow as tf
 import mediapipe as mp
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from landmark_cache import LandmarkCache
+from frame_sampling import sample_video_frames
+from dataset_format import save_dataset
+from features import extract_landmarks, missing_landmarks
+
+# DataProcessor riêng của mỗi process con (mỗi process một MediaPipe Hands)
+_worker_processor = None
+
+def _init_worker(data_folder, labels_file, frame_size, sampler, hand_order):
+    global _worker_processor
+    _worker_processor = DataProcessor(data_folder, labels_file, None, None, frame_size=frame_size, sampler=sampler, hand_order=hand_order)
+
+def _process_video_in_worker(video_file):
+    return _worker_processor._process_video(video_file)
 
 class DataProcessor:
-    def __init__(self, data_folder, labels_file, output_x_file, output_y_file, frame_size=60):
+    def __init__(self, data_folder, labels_file, output_x_file, output_y_file, frame_size=60, cache_dir=None, sampler='sequential',
+                 hand_order='handedness'):
+        """
+        :param cache_dir: Optional folder for the per-video landmark cache; when set,
+                          only new or changed videos are run through MediaPipe.
+        :param sampler: Frame sampling strategy, 'sequential' (decode once) or 'seek'.
+        :param hand_order: Hand slot ordering, see features.extract_landmarks; stored in
+                           the dataset metadata so the model's feature config can match it.
+        """
         self.data_folder = Path(data_folder)
         self.labels_file = Path(labels_file)
         self.output_x_file = output_x_file
         self.output_y_file = output_y_file
-        self.mp_hands = mp.solutions.hands.Hands(static_image_mode=True, max_num_hands=2)
+        self.hands_options = {'static_image_mode': True, 'max_num_hands': 2}
+        # Chỉ tạo MediaPipe Hands khi thực sự trích xuất trong process này (chạy tuần tự);
+        # với process pool mỗi worker tự tạo Hands riêng
+        self.mp_hands = None
         self.frame_size = frame_size
-
-    def process_videos(self):
-        data_X = []
+        self.sampler = sampler
+        self.hand_order = hand_order
+        self.cache = LandmarkCache(cache_dir, self._cache_settings()) if cache_dir else None
+
+    def _cache_settings(self):
+        # Mọi thứ ảnh hưởng tới tọa độ trích xuất; đổi bất kỳ giá trị nào sẽ làm mới cache
+        return {
+            'hands_options': self.hands_options,
+            'frame_size': self.frame_size,
+            'sampler': self.sampler,
+            'hand_order': self.hand_order,
+            'mediapipe_version': getattr(mp, '__version__', 'unknown'),
+        }
+
+    def process_videos(self, num_workers=1):
+        """
+        Extract hand coordinates from every labelled video and save data_X / data_Y.
+
+        :param num_workers: Number of processes. With more than one, videos are
+                            sharded across a process pool (one Hands instance per
+                            worker); results are merged in label/file order, so the
+                            output is identical to a serial run.
+        """
+        video_files, data_Y = self._list_videos()
+        total = len(video_files)
+        data_X = [None] * total
+
+        # Lấy các video đã có trong cache, chỉ trích xuất video mới hoặc đã thay đổi
+        cache_keys = []
+        if self.cache is not None:
+            cache_keys = [self.cache.key_for(video_file) for video_file in video_files]
+            for i, key in enumerate(cache_keys):
+                data_X[i] = self.cache.load(key)
+        pending = [i for i in range(total) if data_X[i] is None]
+        print(f"Processing {len(pending)}/{total} videos with {num_workers} worker(s) "
+              f"({total - len(pending)} loaded from cache)...")
+
+        results = self._extract_videos([video_files[i] for i in pending], num_workers)
+        for i, coordinates in zip(pending, results):
+            data_X[i] = np.asarray(coordinates, dtype=np.float32)
+            if self.cache is not None:
+                self.cache.save(cache_keys[i], data_X[i])
+
+        if self.cache is not None:
+            removed = self.cache.prune(cache_keys)
+            print(f"Removed {removed} stale cache entries")
+
+        save_dataset(
+            self.output_x_file, self.output_y_file, data_X, data_Y,
+            frame_size=self.frame_size,
+            sampler=self.sampler,
+            hand_order=self.hand_order,
+            labels_file=self.labels_file.name
+        )
+
+    def _extract_videos(self, video_files, num_workers):
+        """
+        Yield the coordinates of each video in order, serially or from a process pool.
+        """
+        if num_workers > 1 and len(video_files) > 1:
+            with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                     initargs=(str(self.data_folder), str(self.labels_file), self.frame_size, self.sampler,
+                                               self.hand_order)) as pool:
+                results = pool.map(_process_video_in_worker, video_files, chunksize=4)
+                yield from self._with_progress(results, video_files)
+        else:
+            results = (self._process_video(video_file) for video_file in video_files)
+            yield from self._with_progress(results, video_files)
+
+    def _list_videos(self):
+        """
+        List the videos of every label folder in a deterministic (label, file name) order.
+
+        :return: (video_files, labels) with one label index per video.
+        """
+        video_files = []
         data_Y = []
 
         with open(self.labels_file, 'r') as file:
@@ -27,50 +126,34 @@ class DataProcessor:
                 print(f"Label folder {label_folder} not found. Skipping.")
                 continue
 
-            for video_file in label_folder.glob("*.mp4"):
-                frames = self._extract_frames(video_file, num_frames=self.frame_size)
-                coordinates = [self._extract_hand_coordinates(frame) for frame in frames]
-                data_X.append(coordinates)
+            for video_file in sorted(label_folder.glob("*.mp4")):
+                video_files.append(video_file)
                 data_Y.append(int(label_info['index']))
 
-        np.save(self.output_x_file, np.array(data_X, dtype=object))
-        np.save(self.output_y_file, np.array(data_Y, dtype=int))
-
-    def _extract_frames(self, video_path, num_frames):
-        import cv2
+        return video_files, data_Y
 
-        cap = cv2.VideoCapture(str(video_path))
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        frame_indices = np.linspace(0, total_frames - 1, num_frames, dtype=int)
-        frames = []
+    def _with_progress(self, results, video_files):
+        total = len(video_files)
+        for done, (video_file, coordinates) in enumerate(zip(video_files, results), start=1):
+            if done % 10 == 0 or done == total:
+                print(f"[{done}/{total}] {video_file.parent.name}/{video_file.name}")
+            yield coordinates
 
-        for idx in frame_indices:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-            ret, frame = cap.read()
-            if ret:
-                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            else:
-                frames.append(None)  # Add None if frame can't be read
+    def _process_video(self, video_file):
+        frames = self._extract_frames(video_file, num_frames=self.frame_size)
+        return [self._extract_hand_coordinates(frame) for frame in frames]
 
-        cap.release()
-        return frames
+    def _extract_frames(self, video_path, num_frames):
+        return sample_video_frames(video_path, num_frames, strategy=self.sampler)
 
     def _extract_hand_coordinates(self, frame):
         if frame is None:
-            return [[-1, -1]] * 42  # 21 points per hand, 2 hands
-
-        results = self.mp_hands.process(frame)
-        coordinates = []
-
-        for hand_landmarks in results.multi_hand_landmarks or []:
-            for lm in hand_landmarks.landmark:
-                coordinates.append([lm.x, lm.y])
-
-        # Fill missing points with [-1, -1]
-        while len(coordinates) < 42:
-            coordinates.append([-1, -1])
+            return missing_landmarks()  # 21 points per hand, 2 hands, all [-1, -1]
 
-        return coordinates
+        if self.mp_hands is None:
+            self.mp_hands = mp.solutions.hands.Hands(**self.hands_options)
+        # Dùng chung hàm trích xuất với server (features.py) để hai luồng không lệch nhau
+        return extract_landmarks(self.mp_hands.process(frame), self.hand_order)
     
 if __name__ == "__main__":
     # Example usage:
@@ -86,7 +169,8 @@ if __name__ == "__main__":
         data_folder="D:/Final_Project/VSL-Translator-Duong/augmented_data",
         labels_file="../dataset/labels.json",
         output_x_file="D:/Final_Project/VSL-Translator-Duong/Backend/dataset/data_X.npy",
-        output_y_file="D:/Final_Project/VSL-Translator-Duong/Backend/datasetdata_Y.npy"
+        output_y_file="D:/Final_Project/VSL-Translator-Duong/Backend/datasetdata_Y.npy",
+        cache_dir="D:/Final_Project/VSL-Translator-Duong/Backend/dataset/landmark_cache"
     )
-    data_processor.process_videos()
+    data_processor.process_videos(num_workers=os.cpu_count())
 
@@ -0,0 +1,155 @@
+import json
+import os
+import shutil
+import sys
+import time
+import numpy as np
+
+try:
+    from Backend.services.inference_backends import TFLiteBackend
+except ImportError:
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    from Backend.services.inference_backends import TFLiteBackend
+
+# 'int8' (hiệu chỉnh toàn phần) vẫn được export_tflite hỗ trợ nhưng converter TF 2.21 bị segfault
+# trên đồ thị LSTM này, không bắt được bằng try/except, nên chỉ chạy khi truyền modes=... tường minh
+QUANTIZATION_MODES = ('dynamic', 'float16')
+
+class ModelQuantizer:
+    def __init__(self, cnn_lstm_model, train_dataset, test_dataset, max_accuracy_drop=0.01, results_dir='results/quantized'):
+        """
+        Post-training quantization of a trained CNNLSTMModel with an accuracy gate.
+
+        :param cnn_lstm_model: Trained CNNLSTMModel (float32 reference).
+        :param train_dataset: Batched training split; calibration sequences for int8 come from it.
+        :param test_dataset: Batched test split used for accuracy and the regression gate.
+        :param max_accuracy_drop: Largest accepted drop in test accuracy (0.01 = 1 point).
+        :param results_dir: Folder for the quantized artifacts and the report.
+        """
+        self.cnn_lstm_model = cnn_lstm_model
+        self.train_dataset = train_dataset
+        self.test_dataset = test_dataset
+        self.max_accuracy_drop = max_accuracy_drop
+        self.results_dir = results_dir
+
+        # Gom tập test thành mảng numpy để chạy interpreter TFLite
+        self.test_X = np.concatenate([x.numpy() for x, _ in test_dataset], axis=0).astype(np.float32)
+        self.test_y = np.concatenate([y.numpy().reshape(-1) for _, y in test_dataset]).astype(int)
+
+    def representative_data(self, num_samples=200):
+        """
+        Sequences drawn from the training split of data_X.npy to calibrate int8 activations.
+        """
+        for sequence, _ in self.train_dataset.unbatch().take(num_samples):
+            yield sequence.numpy()
+
+    def quantize_all(self, modes=QUANTIZATION_MODES, publish_dir=None, num_calibration_samples=200):
+        """
+        Export every quantization mode, measure accuracy, latency and size, and
+        publish each artifact as soon as it passes the accuracy gate.
+
+        :param modes: Quantization modes to try (see CNNLSTMModel.export_tflite); 'int8'
+                      is opt-in because the converter can crash the process on it.
+        :param publish_dir: Folder receiving the artifacts that pass the gate (None to skip publishing).
+        :param num_calibration_samples: Representative sequences used for int8.
+        :return: Report dict keyed by artifact name.
+        """
+        os.makedirs(self.results_dir, exist_ok=True)
+
+        # Độ chính xác tham chiếu của model float32
+        baseline = self.cnn_lstm_model.calculate_test_accuracy(self.test_dataset, results_dir=self.results_dir)
+        baseline_accuracy = float(baseline['accuracy'])
+
+        report = {}
+        report_path = os.path.join(self.results_dir, 'quantization_report.json')
+        # float32 là artifact tham chiếu: lỗi xuất / đánh giá cũng được ghi vào báo cáo như các mode khác
+        for mode in (None,) + tuple(modes):
+            name = mode or 'float32'
+            output_path = os.path.join(self.results_dir, f'model_{name}.tflite')
+            representative_data = self.representative_data(num_calibration_samples) if mode == 'int8' else None
+            try:
+                self.cnn_lstm_model.export_tflite(output_path, quantization=mode, representative_data=representative_data)
+                report[name] = self._evaluate(output_path, baseline_accuracy)
+            except Exception as e:
+                print(f"Không thể lượng tử hóa / đánh giá '{name}': {str(e)}")
+                report[name] = {'error': str(e), 'passed': False}
+            if publish_dir is not None:
+                self._publish(name, report[name], publish_dir)
+            # Ghi báo cáo sau mỗi mode để giữ kết quả nếu một mode sau làm hỏng tiến trình
+            self._save_report(report_path, baseline_accuracy, report)
+
+        self._print_report(baseline_accuracy, report)
+        print(f"Quantization report saved to '{report_path}'")
+        return report
+
+    def _save_report(self, report_path, baseline_accuracy, report):
+        with open(report_path, 'w', encoding='utf-8') as file:
+            json.dump({'baseline_accuracy': baseline_accuracy, 'max_accuracy_drop': self.max_accuracy_drop, 'artifacts': report}, file, indent=4)
+
+    def _evaluate(self, tflite_path, baseline_accuracy, latency_runs=200):
+        # Cùng backend (lượng tử hóa đầu vào / giải lượng tử đầu ra) với server
+        backend = TFLiteBackend(tflite_path, num_threads=1)
+        predicted_classes = np.argmax(backend.predict_proba_batch(self.test_X), axis=1)
+        accuracy = float(np.mean(predicted_classes == self.test_y))
+
+        # Độ trễ trên CPU với 1 luồng, cho từng chuỗi (1, timesteps, features)
+        sample = self.test_X[:1]
+        backend.predict_proba_batch(sample)
+        start = time.perf_counter()
+        for _ in range(latency_runs):
+            backend.predict_proba_batch(sample)
+        latency_ms = (time.perf_counter() - start) * 1000 / latency_runs
+
+        accuracy_drop = baseline_accuracy - accuracy
+        return {
+            'path': tflite_path,
+            'size_kb': os.path.getsize(tflite_path) / 1024,
+            'accuracy': accuracy,
+            'accuracy_drop': accuracy_drop,
+            'latency_ms': latency_ms,
+            'passed': accuracy_drop <= self.max_accuracy_drop,
+        }
+
+    def _publish(self, name, result, publish_dir):
+        if 'error' in result:
+            return
+        if not result['passed']:
+            print(f"Từ chối xuất bản '{name}': độ chính xác giảm vượt ngưỡng {self.max_accuracy_drop*100:.2f}%")
+            return
+        os.makedirs(publish_dir, exist_ok=True)
+        published_path = os.path.join(publish_dir, os.path.basename(result['path']))
+        shutil.copyfile(result['path'], published_path)
+        result['published_path'] = published_path
+        print(f"Đã xuất bản '{name}' tới '{published_path}'")
+
+    def _print_report(self, baseline_accuracy, report):
+        print(f"\nĐộ chính xác model Keras float32: {baseline_accuracy*100:.2f}%")
+        print(f"{'Model':<10}{'Size (KB)':>12}{'Accuracy':>12}{'Drop':>10}{'Latency (ms)':>14}{'Passed':>8}")
+        for name, result in report.items():
+            if 'error' in result:
+                print(f"{name:<10}{'lỗi: ' + result['error'][:60]:>66}")
+                continue
+            print(f"{name:<10}{result['size_kb']:>12.1f}{result['accuracy']*100:>11.2f}%"
+                  f"{result['accuracy_drop']*100:>9.2f}%{result['latency_ms']:>14.3f}{str(result['passed']):>8}")
+
+if __name__ == "__main__":
+    from vsldataset import VSLDataset
+    from modeling import CNNLSTMModel
+    from features import feature_dim, load_feature_config
+
+    with open('../dataset/labels.json', 'r', encoding='utf-8') as file:
+        labels_json = json.load(file)
+
+    # Đánh giá và hiệu chỉnh int8 trên cùng đặc trưng mà model đã huấn luyện (best.features.json)
+    feature_config = load_feature_config('./results/best.keras')
+    dataset = VSLDataset(numpy_x_file='../dataset/data_X.npy', numpy_y_file='../dataset/data_Y.npy')
+    train_dataset, val_dataset, test_dataset = dataset.create_datasets(
+        train_size=0.7, val_size=0.2, batch_size=32, feature_config=feature_config
+    )
+
+    cnn_lstm_model = CNNLSTMModel(input_shape=(60, feature_dim(feature_config)), num_classes=len(labels_json))
+    cnn_lstm_model.load_model_from_file('./results/best.keras')
+
+    # Chỉ xuất bản model lượng tử hóa nếu độ chính xác giảm không quá 1%
+    quantizer = ModelQuantizer(cnn_lstm_model, train_dataset, test_dataset, max_accuracy_drop=0.01, results_dir='./results/quantized')
+    quantizer.quantize_all(publish_dir='./results/published')
@@ -0,0 +1,190 @@
+import json
+import os
+import numpy as np
+import tensorflow as tf
+from sklearn.model_selection import train_test_split
+from dataset_format import load_dataset
+from vsldataset import feature_map
+
+SHARD_FORMAT_VERSION = 2
+INDEX_FILE = 'index.json'
+INDEX_ARRAYS_FILE = 'index.npz'
+
+def write_shards(x_file, y_file, output_dir, shard_size=1024, seed=42):
+    """
+    Split data_X.npy / data_Y.npy into fixed-size .npy shards plus an index.
+
+    The source is memory-mapped, so datasets larger than RAM can be sharded.
+    Samples are assigned to shards by a seeded permutation: data_X.npy is
+    written label by label, so cutting it in file order would give shards of
+    only a few classes and batches dominated by them.
+    The index stores, for every source sample, its shard, its offset inside the
+    shard and its label, so splits can be computed without reading any
+    landmarks; `order` maps shard positions back to source sample ids.
+
+    :param shard_size: Samples per shard.
+    :param seed: Seed of the sample permutation.
+    :return: Number of shards written.
+    """
+    data_X, data_Y = load_dataset(x_file, y_file)
+    os.makedirs(output_dir, exist_ok=True)
+
+    num_samples = data_X.shape[0]
+    order = np.random.default_rng(seed).permutation(num_samples)
+    shards = []
+    for shard_id, start in enumerate(range(0, num_samples, shard_size)):
+        end = min(start + shard_size, num_samples)
+        # Sắp xếp chỉ số trong shard để đọc file memmap gần tuần tự; thứ tự trong shard không quan trọng
+        order[start:end] = np.sort(order[start:end])
+        sample_ids = order[start:end]
+        name = f'shard_{shard_id:05d}'
+        np.save(os.path.join(output_dir, f'{name}_X.npy'), np.ascontiguousarray(data_X[sample_ids], dtype=np.float32))
+        np.save(os.path.join(output_dir, f'{name}_Y.npy'), np.asarray(data_Y[sample_ids], dtype=np.int64))
+        shards.append({'name': name, 'num_samples': end - start})
+
+    # Vị trí của từng mẫu gốc trong chuỗi shard
+    positions = np.empty(num_samples, dtype=np.int64)
+    positions[order] = np.arange(num_samples)
+    np.savez(
+        os.path.join(output_dir, INDEX_ARRAYS_FILE),
+        shard_id=(positions // shard_size).astype(np.int32),
+        offset=(positions % shard_size).astype(np.int32),
+        label=np.asarray(data_Y, dtype=np.int64),
+        order=order,
+    )
+    with open(os.path.join(output_dir, INDEX_FILE), 'w', encoding='utf-8') as file:
+        json.dump({
+            'format_version': SHARD_FORMAT_VERSION,
+            'num_samples': int(num_samples),
+            'timesteps': int(data_X.shape[1]),
+            'features': int(data_X.shape[2]),
+            'shard_size': shard_size,
+            'seed': seed,
+            'shards': shards,
+        }, file, indent=4)
+
+    print(f"Wrote {num_samples} samples to {len(shards)} shards in '{output_dir}'")
+    return len(shards)
+
+class ShardedVSLDataset:
+    def __init__(self, shard_dir):
+        """
+        Streaming reader for a dataset written by write_shards.
+
+        :param shard_dir: Folder containing the shards and the index.
+        """
+        self.shard_dir = shard_dir
+        with open(os.path.join(shard_dir, INDEX_FILE), 'r', encoding='utf-8') as file:
+            self.index = json.load(file)
+        index_arrays = np.load(os.path.join(shard_dir, INDEX_ARRAYS_FILE))
+        self.shard_ids = index_arrays['shard_id']
+        self.offsets = index_arrays['offset']
+        self.labels = index_arrays['label']
+        self.timesteps = self.index['timesteps']
+        self.features = self.index['features']
+
+    def split_indices(self, train_size=0.7, val_size=0.2, random_state=42):
+        """
+        Stratified train/val/test split of sample ids, computed from the index only.
+
+        :return: (train_ids, val_ids, test_ids) as sorted int arrays.
+        """
+        sample_ids = np.arange(len(self.labels))
+        train_ids, temp_ids = self._split(sample_ids, test_size=1 - train_size, random_state=random_state)
+
+        # Calculate the ratio of validation to temp dataset
+        val_ratio = val_size / (1 - train_size)
+        val_ids, test_ids = self._split(temp_ids, test_size=1 - val_ratio, random_state=random_state)
+        return np.sort(train_ids), np.sort(val_ids), np.sort(test_ids)
+
+    def create_datasets(self, train_size=0.7, val_size=0.2, batch_size=32, shuffle_buffer=4096,
+                        cache=False, num_parallel_reads=4, augment=None, feature_config=None):
+        """
+        Build streaming train/val/test datasets.
+
+        Shards are read in parallel and interleaved, so only a few shards are in
+        memory at a time; the training split reshuffles shard order every epoch
+        and mixes samples through a shuffle buffer.
+
+        :param shuffle_buffer: Samples held by the training shuffle buffer.
+        :param cache: False, True (cache in memory after the first epoch) or a file path prefix.
+        :param num_parallel_reads: Shards read concurrently.
+        :param augment: Optional callable (batch_X, batch_y) -> (batch_X, batch_y) applied to training batches.
+        :param feature_config: Optional features.py config applied to every split after augmentation.
+        """
+        train_ids, val_ids, test_ids = self.split_indices(train_size, val_size)
+
+        train_dataset = self._build(train_ids, batch_size, shuffle_buffer, cache, num_parallel_reads, 'train', training=True)
+        if augment is not None:
+            train_dataset = train_dataset.map(augment, num_parallel_calls=tf.data.AUTOTUNE)
+
+        val_dataset = self._build(val_ids, batch_size, shuffle_buffer, cache, num_parallel_reads, 'val', training=False)
+        test_dataset = self._build(test_ids, batch_size, shuffle_buffer, cache, num_parallel_reads, 'test', training=False)
+
+        if feature_config is not None:
+            to_features = feature_map(feature_config)
+            train_dataset = train_dataset.map(to_features, num_parallel_calls=tf.data.AUTOTUNE)
+            val_dataset = val_dataset.map(to_features, num_parallel_calls=tf.data.AUTOTUNE)
+            test_dataset = test_dataset.map(to_features, num_parallel_calls=tf.data.AUTOTUNE)
+        return train_dataset.prefetch(tf.data.AUTOTUNE), val_dataset.prefetch(tf.data.AUTOTUNE), test_dataset.prefetch(tf.data.AUTOTUNE)
+
+    def _split(self, sample_ids, test_size, random_state):
+        try:
+            return train_test_split(sample_ids, test_size=test_size, random_state=random_state,
+                                    stratify=self.labels[sample_ids])
+        except ValueError:
+            # Có lớp quá ít mẫu để phân tầng
+            print("Warning: some classes have too few samples for a stratified split, using a random split")
+            return train_test_split(sample_ids, test_size=test_size, random_state=random_state)
+
+    def _build(self, sample_ids, batch_size, shuffle_buffer, cache, num_parallel_reads, split_name, training):
+        # Nhóm các mẫu của split theo shard để mỗi shard chỉ đọc một lần
+        offsets_by_shard = {}
+        for sample_id in sample_ids:
+            offsets_by_shard.setdefault(int(self.shard_ids[sample_id]), []).append(int(self.offsets[sample_id]))
+        shard_list = sorted(offsets_by_shard)
+        offsets_by_shard = {shard_id: np.array(offsets) for shard_id, offsets in offsets_by_shard.items()}
+        shard_names = [shard['name'] for shard in self.index['shards']]
+
+        def read_shard(shard_id):
+            shard_id = int(shard_id)
+            name = shard_names[shard_id]
+            shard_X = np.load(os.path.join(self.shard_dir, f'{name}_X.npy'), mmap_mode='r')
+            shard_Y = np.load(os.path.join(self.shard_dir, f'{name}_Y.npy'), mmap_mode='r')
+            offsets = offsets_by_shard[shard_id]
+            return (np.asarray(shard_X[offsets], dtype=np.float32),
+                    np.asarray(shard_Y[offsets], dtype=np.float32).reshape(-1, 1))
+
+        def load(shard_id):
+            batch_X, batch_y = tf.numpy_function(read_shard, [shard_id], (tf.float32, tf.float32))
+            batch_X.set_shape((None, self.timesteps, self.features))
+            batch_y.set_shape((None, 1))
+            return tf.data.Dataset.from_tensor_slices((batch_X, batch_y))
+
+        dataset = tf.data.Dataset.from_tensor_slices(np.array(shard_list, dtype=np.int64))
+        if training:
+            dataset = dataset.shuffle(max(len(shard_list), 1), reshuffle_each_iteration=True)
+        dataset = dataset.interleave(
+            load,
+            cycle_length=num_parallel_reads,
+            num_parallel_calls=tf.data.AUTOTUNE,
+            deterministic=not training
+        )
+
+        if cache is True:
+            dataset = dataset.cache()
+        elif cache:
+            dataset = dataset.cache(f'{cache}_{split_name}')
+
+        if training:
+            dataset = dataset.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+        return dataset.batch(batch_size)
+
+if __name__ == "__main__":
+    # Chia data_X.npy thành các shard rồi đọc thử một batch
+    write_shards('../dataset/data_X.npy', '../dataset/data_Y.npy', '../dataset/shards', shard_size=1024)
+
+    dataset = ShardedVSLDataset('../dataset/shards')
+    train_dataset, val_dataset, test_dataset = dataset.create_datasets(train_size=0.7, val_size=0.2, batch_size=32)
+    for frames, labels in train_dataset.take(1):
+        print(frames.shape, labels.shape)
@@ -0,0 +1,182 @@
+import json
+import os
+import numpy as np
+import tensorflow as tf
+from keras.models import Sequential, load_model # type: ignore
+from keras.layers import Input, Conv1D, LSTM, Dense, Dropout, BatchNormalization # type: ignore
+from keras.optimizers import Adam # type: ignore
+from keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau # type: ignore
+
+STREAMING_FORMAT_VERSION = 1
+
+class StreamingCNNLSTMModel:
+    def __init__(self, input_shape, num_classes, conv_filters=(32, 64), kernel_sizes=(5, 3), lstm_units=(64, 32),
+                 dense_units=64, dropout=0.3, learning_rate=0.001):
+        """
+        Causal, unidirectional variant of CNNLSTMModel that emits a class posterior per frame.
+
+        Conv1D layers use causal padding and no pooling, and the LSTMs are
+        unidirectional with return_sequences, so the output at frame t only
+        depends on frames <= t. Served frame by frame by
+        services/streaming_service.StreamingRecognizer, which keeps the conv
+        buffers and LSTM state between frames (O(1) work per new frame).
+
+        :param input_shape: (timesteps, features) of the training windows.
+        """
+        self.input_shape = input_shape
+        self.num_classes = num_classes
+        self.conv_filters = conv_filters
+        self.kernel_sizes = kernel_sizes
+        self.lstm_units = lstm_units
+        self.dense_units = dense_units
+        self.dropout = dropout
+        self.learning_rate = learning_rate
+        self.model = self._build_model()
+
+    def _build_model(self):
+        layers = [Input(shape=(None, self.input_shape[1]))]
+        for filters, kernel_size in zip(self.conv_filters, self.kernel_sizes):
+            layers += [Conv1D(filters, kernel_size=kernel_size, activation='relu', padding='causal'), BatchNormalization()]
+        layers += [LSTM(units, return_sequences=True) for units in self.lstm_units]
+        layers += [
+            Dense(self.dense_units, activation='relu'),
+            Dropout(self.dropout),
+            Dense(self.num_classes, activation='softmax')
+        ]
+        model = Sequential(layers)
+
+        model.compile(
+            optimizer=Adam(learning_rate=self.learning_rate, clipnorm=1.0),
+            loss='sparse_categorical_crossentropy',
+            metrics=['accuracy']
+        )
+        return model
+
+    def per_frame_targets(self, dataset, min_weight=0.1):
+        """
+        Turn a (batch_X, batch_y) window dataset into per-frame targets.
+
+        Every frame gets the window label; the loss weight ramps linearly from
+        `min_weight` at the first frame to 1 at the last one, since early frames
+        have seen little of the sign.
+        """
+        timesteps = self.input_shape[0]
+        weights = tf.linspace(min_weight, 1.0, timesteps)
+
+        def expand(batch_X, batch_y):
+            batch_y = tf.reshape(batch_y, (-1, 1))
+            frame_y = tf.repeat(batch_y, timesteps, axis=1)
+            frame_weights = tf.broadcast_to(weights, tf.shape(frame_y))
+            return batch_X, frame_y, frame_weights
+
+        return dataset.map(expand, num_parallel_calls=tf.data.AUTOTUNE)
+
+    def train(self, train_dataset, validation_dataset, epochs=100, patience=10, model_path='streaming.keras', results_dir='results'):
+        os.makedirs(results_dir, exist_ok=True)
+        model_path = os.path.join(results_dir, model_path)
+
+        callbacks = [
+            EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True, mode='min'),
+            ModelCheckpoint(model_path, monitor='val_loss', save_best_only=True, mode='min', verbose=1),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=3, min_lr=1e-6, verbose=1),
+        ]
+
+        print("Training the streaming model...")
+        history = self.model.fit(
+            self.per_frame_targets(train_dataset),
+            validation_data=self.per_frame_targets(validation_dataset),
+            epochs=epochs,
+            verbose=1,
+            callbacks=callbacks
+        )
+        print(f"Training complete. Best model saved as '{model_path}'")
+        return history
+
+    def evaluate_last_frame(self, test_dataset):
+        """
+        Accuracy of the posterior at the last frame of each window, comparable
+        with the window-level accuracy of CNNLSTMModel.
+        """
+        y_true, y_pred = [], []
+        for batch_X, batch_y in test_dataset:
+            probs = self.model.predict_on_batch(batch_X)
+            y_pred.extend(np.argmax(np.asarray(probs)[:, -1], axis=1))
+            y_true.extend(np.asarray(batch_y).reshape(-1).astype(int))
+        accuracy = float(np.mean(np.array(y_true) == np.array(y_pred)))
+        print(f"Last-frame accuracy: {accuracy*100:.2f}%")
+        return accuracy
+
+    def export_streaming_weights(self, output_path):
+        """
+        Write the weights and layer spec read by services/streaming_service.StreamingModel.
+
+        The .npz only holds numpy arrays, so the server can run the model
+        frame by frame without loading TensorFlow.
+
+        :param output_path: Path of the .npz file to write.
+        """
+        spec = []
+        arrays = {}
+        for i, layer in enumerate(self.model.layers):
+            kind = layer.__class__.__name__
+            weights = layer.get_weights()
+            if kind == 'Conv1D':
+                spec.append({'type': 'conv1d', 'dilation': int(layer.dilation_rate[0]), 'activation': layer.activation.__name__})
+                arrays[f'{i}_kernel'], arrays[f'{i}_bias'] = weights
+            elif kind == 'BatchNormalization':
+                spec.append({'type': 'batchnorm', 'epsilon': float(layer.epsilon)})
+                arrays[f'{i}_gamma'], arrays[f'{i}_beta'], arrays[f'{i}_mean'], arrays[f'{i}_variance'] = weights
+            elif kind == 'LSTM':
+                spec.append({'type': 'lstm', 'units': int(layer.units)})
+                arrays[f'{i}_kernel'], arrays[f'{i}_recurrent_kernel'], arrays[f'{i}_bias'] = weights
+            elif kind == 'Dense':
+                spec.append({'type': 'dense', 'activation': layer.activation.__name__})
+                arrays[f'{i}_kernel'], arrays[f'{i}_bias'] = weights
+            elif kind == 'Dropout':
+                spec.append({'type': 'identity'})
+            else:
+                raise ValueError(f"Layer {kind} is not supported by the streaming runtime")
+
+        meta = {
+            'format_version': STREAMING_FORMAT_VERSION,
+            'num_features': int(self.input_shape[1]),
+            'num_classes': int(self.num_classes),
+            'layers': spec,
+        }
+        np.savez(output_path, spec=np.array(json.dumps(meta)), **{k: v.astype(np.float32) for k, v in arrays.items()})
+        print(f"Streaming weights exported to '{output_path}'")
+        return output_path
+
+    def load_model_from_file(self, model_path):
+        """
+        Load a trained streaming model from the specified file path.
+        """
+        if os.path.exists(model_path):
+            self.model = load_model(model_path)
+            print(f"Model loaded from {model_path}")
+        else:
+            print(f"Model file not found at {model_path}")
+
+if __name__ == "__main__":
+    from vsldataset import VSLDataset
+    from augmentation import LandmarkAugmenter
+    from features import feature_dim, load_feature_config, save_feature_config
+
+    with open('../dataset/labels.json', 'r', encoding='utf-8') as file:
+        labels_json = json.load(file)
+
+    # Cùng đặc trưng và thứ tự bàn tay với model chính: server trích xuất tọa độ theo cấu hình của best.keras
+    feature_config = load_feature_config('./results/best.keras')
+    dataset = VSLDataset(numpy_x_file='../dataset/data_X.npy', numpy_y_file='../dataset/data_Y.npy')
+    train_dataset, val_dataset, test_dataset = dataset.create_datasets(
+        train_size=0.7, val_size=0.2, batch_size=32,
+        augment=LandmarkAugmenter(hand_order=feature_config['hand_order']), feature_config=feature_config
+    )
+
+    streaming_model = StreamingCNNLSTMModel(input_shape=(60, feature_dim(feature_config)), num_classes=len(labels_json))
+    streaming_model.train(train_dataset, val_dataset, epochs=1000, patience=10, model_path='streaming.keras', results_dir='./results')
+    streaming_model.evaluate_last_frame(test_dataset)
+
+    # Server: VSL_STREAMING_MODEL_PATH=./preparation/results/streaming.npz
+    streaming_model.export_streaming_weights('./results/streaming.npz')
+    save_feature_config('./results/streaming.npz', feature_config)
@@ -2,44 +2,127 @@ import numpy as np
 import tensorflow as tf
 import os
 from sklearn.model_selection import train_test_split
+from dataset_format import load_dataset
+from features import compute_features, feature_dim
 
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
 
+def feature_map(feature_config):
+    """
+    tf.data map function applying features.compute_features to (batch_X, batch_y)
+    batches, so training uses the exact NumPy code the server runs.
+    """
+    num_features = feature_dim(feature_config)
+
+    def transform(batch_X):
+        return compute_features(batch_X, feature_config)
+
+    def apply(batch_X, batch_y):
+        features = tf.numpy_function(transform, [batch_X], tf.float32)
+        features.set_shape((None, batch_X.shape[1], num_features))
+        return features, batch_y
+
+    return apply
+
 class VSLDataset:
     def __init__(self, numpy_x_file, numpy_y_file):
         self.numpy_x_file = numpy_x_file
         self.numpy_y_file = numpy_y_file
 
-    def create_datasets(self, train_size=0.7, val_size=0.2, batch_size=32):
-        # Load data from numpy files
-        data_X = np.load(self.numpy_x_file, allow_pickle=True)
-        data_Y = np.load(self.numpy_y_file)
+    @staticmethod
+    def split_indices(num_samples, train_size=0.7, val_size=0.2):
+        """
+        Sample indices of the train / validation / test splits.
 
-        # Reshape data_X for LSTM: (batch_size, timesteps, features)
-        data_X = np.array(data_X, dtype=np.float32).reshape(data_X.shape[0], data_X.shape[1], -1)
-        data_Y = np.array(data_Y, dtype=np.float32).reshape(-1, 1)  # Ensure data_Y is 2D for regression
+        Every trainer (create_datasets, architecture search, distillation) splits
+        through here so they all see the same validation and test samples.
 
-        # Split into train and temp datasets
-        X_train, X_temp, y_train, y_temp = train_test_split(data_X, data_Y, test_size=1-train_size, random_state=42)
+        :return: (train_idx, val_idx, test_idx)
+        """
+        # Chia theo chỉ số (cùng random_state, cùng kết quả như chia trực tiếp các mảng) để data_X vẫn là memmap
+        sample_ids = np.arange(num_samples)
+        train_idx, temp_idx = train_test_split(sample_ids, test_size=1-train_size, random_state=42)
 
         # Calculate the ratio of validation to temp dataset
         val_ratio = val_size / (1 - train_size)
 
         # Split temp dataset into validation and test datasets
-        X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=1-val_ratio, random_state=42)
+        val_idx, test_idx = train_test_split(temp_idx, test_size=1-val_ratio, random_state=42)
+        return train_idx, val_idx, test_idx
+
+    def load_features(self, sample_ids, feature_config):
+        """
+        Features and labels of `sample_ids`, read from the memory-mapped arrays into memory.
 
-        # Convert datasets to TensorFlow Dataset objects
-        train_dataset = tf.data.Dataset.from_tensor_slices((X_train, y_train))
-        train_dataset = train_dataset.shuffle(len(y_train)).batch(batch_size).prefetch(tf.data.AUTOTUNE)
+        :return: (X, y) with X of shape (samples, timesteps, features) and float32 labels.
+        """
+        data_X, data_Y = load_dataset(self.numpy_x_file, self.numpy_y_file)
+        return compute_features(data_X[sample_ids], feature_config), np.asarray(data_Y[sample_ids], dtype=np.float32)
 
-        val_dataset = tf.data.Dataset.from_tensor_slices((X_val, y_val))
-        val_dataset = val_dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+    @staticmethod
+    def in_memory_batches(data_X, data_Y, batch_size=32, shuffle=False):
+        """
+        Batched dataset over arrays already in memory (see load_features).
+        """
+        dataset = tf.data.Dataset.from_tensor_slices((data_X, data_Y))
+        if shuffle:
+            dataset = dataset.shuffle(len(data_Y))
+        return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+    def create_datasets(self, train_size=0.7, val_size=0.2, batch_size=32, augment=None, feature_config=None):
+        """
+        :param augment: Optional callable (batch_X, batch_y) -> (batch_X, batch_y), e.g. a
+                        LandmarkAugmenter, applied to training batches in parallel.
+        :param feature_config: Optional features.py config; applied to every split after
+                               augmentation (augmentation works on raw coordinates).
+        """
+        # Load data from numpy files, already (batch_size, timesteps, features) float32 and memory-mapped
+        data_X, data_Y = load_dataset(self.numpy_x_file, self.numpy_y_file)
+        data_Y = np.array(data_Y, dtype=np.float32).reshape(-1, 1)  # Ensure data_Y is 2D for regression
 
-        test_dataset = tf.data.Dataset.from_tensor_slices((X_test, y_test))
-        test_dataset = test_dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+        train_idx, val_idx, test_idx = self.split_indices(len(data_Y), train_size, val_size)
+
+        # Đọc từng batch từ memmap khi huấn luyện thay vì chép cả tập vào graph
+        train_dataset = self._batches(data_X, data_Y, train_idx, batch_size, shuffle=True)
+        if augment is not None:
+            train_dataset = train_dataset.map(augment, num_parallel_calls=tf.data.AUTOTUNE)
+
+        val_dataset = self._batches(data_X, data_Y, val_idx, batch_size, shuffle=False)
+        test_dataset = self._batches(data_X, data_Y, test_idx, batch_size, shuffle=False)
+
+        if feature_config is not None:
+            to_features = feature_map(feature_config)
+            train_dataset = train_dataset.map(to_features, num_parallel_calls=tf.data.AUTOTUNE)
+            val_dataset = val_dataset.map(to_features, num_parallel_calls=tf.data.AUTOTUNE)
+            test_dataset = test_dataset.map(to_features, num_parallel_calls=tf.data.AUTOTUNE)
+
+        train_dataset = train_dataset.prefetch(tf.data.AUTOTUNE)
+        val_dataset = val_dataset.prefetch(tf.data.AUTOTUNE)
+        test_dataset = test_dataset.prefetch(tf.data.AUTOTUNE)
 
         return train_dataset, val_dataset, test_dataset
 
+    def _batches(self, data_X, data_Y, sample_ids, batch_size, shuffle):
+        """
+        Batched (batch_X, batch_y) dataset read from the (memory-mapped) arrays on demand.
+
+        :param shuffle: Draw a new sample order every epoch (the whole split, like a full shuffle buffer).
+        """
+        def generate():
+            order = np.random.permutation(sample_ids) if shuffle else sample_ids
+            for start in range(0, len(order), batch_size):
+                # Chỉ số tăng dần: đọc memmap gần tuần tự; thứ tự trong batch không ảnh hưởng huấn luyện
+                batch_ids = np.sort(order[start:start + batch_size])
+                yield np.asarray(data_X[batch_ids], dtype=np.float32), data_Y[batch_ids]
+
+        return tf.data.Dataset.from_generator(
+            generate,
+            output_signature=(
+                tf.TensorSpec(shape=(None,) + data_X.shape[1:], dtype=tf.float32),
+                tf.TensorSpec(shape=(None, 1), dtype=tf.float32),
+            )
+        ).apply(tf.data.experimental.assert_cardinality(-(-len(sample_ids) // batch_size)))
+
 if __name__ == "__main__":
     # Step 2: Load the dataset for TensorFlow
     dataset = VSLDataset(numpy_x_file='../dataset/data_X.npy', numpy_y_file='../dataset/data_Y.npy')
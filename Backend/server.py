@@ -1,9 +1,17 @@
-from Backend.services.videoprocess_service import VideoProcessor 
+from Backend.services.processorpool_service import VideoProcessorPool, PoolExhaustedError
 from Backend.services.signrecognition_service import SignRecognition
-from Backend.preparation.modeling import CNNLSTMModel
-from fastapi import FastAPI, HTTPException
+from Backend.services.slidingwindow_service import LandmarkRingBuffer
+from Backend.services.gating_service import SegmentGate
+from Backend.services.workerpool_service import BoundedWorkerPool, WorkerPoolSaturatedError
+from Backend.services.batching_service import InferenceBatcher
+from Backend.services.inference_backends import create_backend
+from Backend.services.streaming_service import StreamingModel, StreamingRecognizer
+from Backend.services.videoprocess_service import VideoProcessor
+from Backend.services.archive_service import FrameArchiver
+from Backend.preparation.features import load_feature_config
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from PIL import Image
 from io import BytesIO
 import uvicorn
@@ -11,9 +19,10 @@ from fastapi.middleware.cors import CORSMiddleware
 import cv2
 import numpy as np
 import base64
-from datetime import datetime
 import os
 import json
+import uuid
+import functools
 
 # Khởi tạo ứng dụng FastAPI
 app = FastAPI()
@@ -30,17 +39,98 @@ app.add_middleware(
 # Định nghĩa model request
 class VideoFramesRequest(BaseModel):
     frames: List[str]  # List các frame dạng base64
+    session_id: Optional[str] = None  # Mỗi người dùng một session để giữ trạng thái tracking
+
+# Số frame đưa vào model và số frame mới giữa hai lần dự đoán trên WebSocket
+WINDOW_SIZE = 60
+RECOGNITION_STRIDE = int(os.environ.get('VSL_RECOGNITION_STRIDE', 10))
+# Giới hạn số MediaPipe Hands đồng thời và thời gian giữ session không hoạt động (giây)
+MAX_PROCESSOR_SESSIONS = int(os.environ.get('VSL_MAX_SESSIONS', 16))
+SESSION_IDLE_TIMEOUT = int(os.environ.get('VSL_SESSION_IDLE_TIMEOUT', 300))
+# Số luồng xử lý CPU (decode/MediaPipe/model) và số tác vụ được phép chờ trước khi trả 503
+MAX_WORKERS = int(os.environ.get('VSL_MAX_WORKERS', os.cpu_count() or 4))
+MAX_PENDING_TASKS = int(os.environ.get('VSL_MAX_PENDING_TASKS', MAX_WORKERS * 4))
+# Gom các cửa sổ từ nhiều session thành một batch trong tối đa BATCH_MAX_WAIT_MS
+BATCH_MAX_SIZE = int(os.environ.get('VSL_BATCH_MAX_SIZE', 32))
+BATCH_MAX_WAIT_MS = float(os.environ.get('VSL_BATCH_MAX_WAIT_MS', 5))
+# Dùng tf.function đã biên dịch thay cho model.predict (tắt bằng VSL_FAST_PATH=0)
+USE_FAST_PATH = os.environ.get('VSL_FAST_PATH', '1') == '1'
+# Backend suy luận: 'keras' (mặc định), hoặc 'tflite'/'onnx' để chạy model đã export mà không cần load Keras
+INFERENCE_BACKEND = os.environ.get('VSL_INFERENCE_BACKEND', 'keras')
+INFERENCE_THREADS = int(os.environ.get('VSL_INFERENCE_THREADS', 0)) or None
+# Endpoint xem trước frame có vẽ xương bàn tay (chỉ dùng để debug, tắt mặc định)
+ENABLE_PREVIEW = os.environ.get('VSL_ENABLE_PREVIEW', '0') == '1'
+# Lưu clip (JPEG gốc + tọa độ) chạy nền để thu thập dữ liệu huấn luyện lại; tắt khi không đặt VSL_ARCHIVE_DIR
+ARCHIVE_DIR = os.environ.get('VSL_ARCHIVE_DIR')
+ARCHIVE_SAMPLE_RATE = float(os.environ.get('VSL_ARCHIVE_SAMPLE_RATE', 1.0))
+ARCHIVE_MAX_QUEUE = int(os.environ.get('VSL_ARCHIVE_MAX_QUEUE', 64))
+ARCHIVE_PACK = os.environ.get('VSL_ARCHIVE_PACK', '1') == '1'
+# Model streaming (streaming_model.py): WebSocket trả xác suất theo từng frame thay vì chạy lại cả cửa sổ 60 frame
+STREAMING_MODEL_PATH = os.environ.get('VSL_STREAMING_MODEL_PATH')
+STREAMING_STRIDE = int(os.environ.get('VSL_STREAMING_STRIDE', 1))
+# Cổng lọc trước model: tỉ lệ frame có tay tối thiểu, ngưỡng chuyển động và số frame mở/đóng một đoạn ký hiệu
+ENABLE_GATING = os.environ.get('VSL_ENABLE_GATING', '1') == '1'
+GATE_MIN_HAND_RATIO = float(os.environ.get('VSL_GATE_MIN_HAND_RATIO', 0.3))
+GATE_MOTION_THRESHOLD = float(os.environ.get('VSL_GATE_MOTION_THRESHOLD', 0.004))
+GATE_START_FRAMES = int(os.environ.get('VSL_GATE_START_FRAMES', 3))
+GATE_END_FRAMES = int(os.environ.get('VSL_GATE_END_FRAMES', 8))
+# /ws/landmarks: client tự trích xuất tọa độ và gửi 84 giá trị float16 (little-endian) mỗi frame
+LANDMARK_VALUES_PER_FRAME = 84
+LANDMARK_FRAME_BYTES = LANDMARK_VALUES_PER_FRAME * 2
 
 # Khởi tạo model và các service
 with open('./Backend/dataset/labels.json', 'r', encoding='utf-8') as file:
     labels_json = json.load(file)
 
 num_classes = len(labels_json)
-model_path = './preparation/results/best.keras'
-cnn_lstm_model = CNNLSTMModel(input_shape=(60, 84), num_classes=num_classes)
-cnn_lstm_model.load_model_from_file(model_path)
-video_processor = VideoProcessor()
-sign_recognition = SignRecognition(cnn_lstm_model)
+# Model phục vụ; trỏ tới model student đã distill (distillation.py) khi tải cao, ví dụ ./preparation/results/student.keras
+model_path = os.environ.get('VSL_MODEL_PATH', './preparation/results/best.keras')
+# Cấu hình đặc trưng lưu cạnh model (best.features.json); model cũ không có file dùng tọa độ thô
+feature_config = load_feature_config(model_path)
+processor_pool = VideoProcessorPool(
+    max_size=MAX_PROCESSOR_SESSIONS,
+    idle_timeout=SESSION_IDLE_TIMEOUT,
+    processor_factory=functools.partial(VideoProcessor, hand_order=feature_config['hand_order'])
+)
+if INFERENCE_BACKEND == 'keras':
+    from Backend.preparation.modeling import CNNLSTMModel
+    cnn_lstm_model = CNNLSTMModel(input_shape=(WINDOW_SIZE, 84), num_classes=num_classes)
+    cnn_lstm_model.load_model_from_file(model_path)
+    sign_recognition = SignRecognition(cnn_lstm_model, num_classes=num_classes, fast_path=USE_FAST_PATH,
+                                       feature_config=feature_config)
+else:
+    exported_model_path = os.environ.get(
+        'VSL_EXPORTED_MODEL_PATH',
+        os.path.splitext(model_path)[0] + ('.tflite' if INFERENCE_BACKEND == 'tflite' else '.onnx')
+    )
+    backend = create_backend(INFERENCE_BACKEND, exported_model_path, num_threads=INFERENCE_THREADS)
+    sign_recognition = SignRecognition(num_classes=num_classes, backend=backend, feature_config=feature_config)
+worker_pool = BoundedWorkerPool(max_workers=MAX_WORKERS, max_pending=MAX_PENDING_TASKS)
+inference_batcher = InferenceBatcher(
+    sign_recognition.predict_proba_batch,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    window_shape=sign_recognition.window_shape
+)
+streaming_model = StreamingModel(STREAMING_MODEL_PATH) if STREAMING_MODEL_PATH else None
+if streaming_model is not None and streaming_model.feature_config['hand_order'] != feature_config['hand_order']:
+    # Tọa độ được trích xuất theo thứ tự bàn tay của model chính
+    raise ValueError("The streaming model must use the same hand_order as the main model")
+# Mỗi kết nối WebSocket có một SegmentGate riêng (có trạng thái); window_gate chỉ dùng check_window (không trạng thái)
+segment_gate_factory = functools.partial(
+    SegmentGate,
+    min_hand_ratio=GATE_MIN_HAND_RATIO,
+    motion_threshold=GATE_MOTION_THRESHOLD,
+    start_frames=GATE_START_FRAMES,
+    end_frames=GATE_END_FRAMES
+) if ENABLE_GATING else None
+window_gate = segment_gate_factory() if segment_gate_factory is not None else None
+frame_archiver = FrameArchiver(
+    ARCHIVE_DIR,
+    max_queue=ARCHIVE_MAX_QUEUE,
+    sample_rate=ARCHIVE_SAMPLE_RATE,
+    pack=ARCHIVE_PACK
+) if ARCHIVE_DIR else None
 
 def get_label_by_index(index):
     for key, value in labels_json.items():
@@ -52,13 +142,52 @@ def decode_base64_image(base64_str: str) -> np.ndarray:
     """
     Decode a base64 string to an OpenCV image (NumPy array).
     """
-    base64_str = base64_str.split("data:image/jpeg;base64,")[-1]
-    img_data = base64.b64decode(base64_str)
+    return decode_image_bytes(base64_to_bytes(base64_str))
+
+def base64_to_bytes(base64_str: str) -> bytes:
+    """
+    Strip the data URL header, if any, and return the encoded image bytes.
+    """
+    return base64.b64decode(base64_str.split("base64,")[-1])
+
+def decode_image_bytes(img_data: bytes) -> np.ndarray:
+    """
+    Decode encoded image bytes (JPEG from the HTTP endpoints) to an OpenCV image.
+    """
     img = Image.open(BytesIO(img_data))
     frame = np.array(img)
     frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
     return frame
-    
+
+def decode_jpeg_bytes(jpeg_bytes: bytes) -> np.ndarray:
+    """
+    Decode raw JPEG bytes (one binary WebSocket message) to an RGB image.
+    """
+    nparr = np.frombuffer(jpeg_bytes, np.uint8)
+    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Không giải mã được frame JPEG")
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+def decode_rgb_bytes(rgb_bytes: bytes, width: int, height: int) -> np.ndarray:
+    """
+    Convert raw packed RGB bytes (height x width x 3, uint8) to an image.
+    """
+    expected_size = width * height * 3
+    if len(rgb_bytes) != expected_size:
+        raise ValueError(f"Kích thước frame RGB không hợp lệ: {len(rgb_bytes)} != {expected_size}")
+    # Không copy: luồng nhận dạng không vẽ lên frame nên view chỉ đọc là đủ
+    return np.frombuffer(rgb_bytes, np.uint8).reshape(height, width, 3)
+
+def decode_landmark_bytes(landmark_bytes: bytes) -> np.ndarray:
+    """
+    Convert packed little-endian float16 landmarks (one or more frames of 84
+    values, -1 for missing points) to a float32 (frames, 42, 2) array.
+    """
+    if not landmark_bytes or len(landmark_bytes) % LANDMARK_FRAME_BYTES:
+        raise ValueError(f"Kích thước gói tọa độ không hợp lệ: {len(landmark_bytes)} (bội số của {LANDMARK_FRAME_BYTES})")
+    return np.frombuffer(landmark_bytes, dtype='<f2').astype(np.float32).reshape(-1, LANDMARK_VALUES_PER_FRAME // 2, 2)
+
 def extract_frames_from_base64s(data):
     frames = []
     for base64_image in data.frames:
@@ -66,65 +195,364 @@ def extract_frames_from_base64s(data):
         frames.append(frame)
     return frames
 
-def save_frames_to_folder(frames, predicted_label):
-    # Tạo tên folder theo định dạng yyyy-mm-dd_hhmmss
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-    folder_name = f"saved_frames/{timestamp}_{predicted_label}"
-    
-    # Tạo folder nếu chưa tồn tại
-    os.makedirs(folder_name, exist_ok=True)
-    
-    for idx, frame_base64 in enumerate(frames):
-        # Bỏ phần header của base64 string nếu có
-        if "base64," in frame_base64:
-            frame_base64 = frame_base64.split("base64,")[1]
-            
-        # Decode base64 thành image
-        img_data = base64.b64decode(frame_base64)
-        nparr = np.frombuffer(img_data, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+def predict_from_coordinates(data_X, frames_with_hands):
+    """
+    Run the model on a full window of hand coordinates and build the response
+    returned by both the HTTP and the WebSocket endpoints.
+    """
+    # Kiểm tra xem có frame nào có bàn tay không
+    if frames_with_hands == 0:
+        print("Không phát hiện bàn tay trong frames")
+        return {"status": "no_hand_detected", "label": None}
         
-        # Lưu frame
-        frame_path = os.path.join(folder_name, f"frame_{idx:03d}.jpg")
-        cv2.imwrite(frame_path, frame)
-    
-    return folder_name
+    # Kiểm tra xem có đủ số frame không
+    if len(data_X) < WINDOW_SIZE:
+        print(f"Chưa đủ frames: {len(data_X)}/{WINDOW_SIZE}")
+        return {"status": "insufficient_data", "label": None}
+
+    # Bỏ qua cửa sổ ít frame có tay hoặc đứng yên (không ai đang ra ký hiệu) mà không chạy model
+    if window_gate is not None:
+        gate_status = window_gate.check_window(data_X, frames_with_hands)
+        if gate_status is not None:
+            return {"status": gate_status, "label": None, "frames_with_hands": frames_with_hands}
+
+    # Thực hiện dự đoán (gom batch với các session khác)
+    model_input = sign_recognition.prepare_input(data_X)
+    if model_input is None:
+        return {"status": "prediction_failed", "label": None}
+    predicted_index = int(np.argmax(inference_batcher.predict(model_input)))
+        
+    # Lấy label text
+    label = get_label_by_index(predicted_index)
+    print(f"Dự đoán thành công: {label} (có {frames_with_hands}/{WINDOW_SIZE} frames chứa bàn tay)")
+
+    return {
+        "status": "success", 
+        "label": label,
+        "frames_with_hands": frames_with_hands
+    }
+
+def streaming_response(recognizer, has_hand):
+    """
+    Build the per-frame response of the streaming model from its latest posterior.
+    """
+    predicted_index = int(np.argmax(recognizer.posterior))
+    return {
+        "status": "success",
+        "label": get_label_by_index(predicted_index),
+        "confidence": float(recognizer.posterior[predicted_index]),
+        "frame": recognizer.frames_seen,
+        "hand_detected": has_hand
+    }
+
+def process_frames_sync(request):
+    """
+    Decode, extract hand landmarks and predict for one HTTP request.
+    Runs on a worker thread, never on the event loop.
+    """
+    jpeg_frames = [base64_to_bytes(base64_image) for base64_image in request.frames]
+    frames = [decode_image_bytes(jpeg_bytes) for jpeg_bytes in jpeg_frames]
+    session_id = request.session_id
+    # Không có session_id: mượn một processor ẩn danh đang rảnh (hoặc tạo mới) thay vì xếp hàng trên một session chung
+    with processor_pool.request_session(session_id) as video_processor:
+        data_X, processed_frames, frames_with_hands = video_processor.process_video_from_frames(frames)
+        # data_X là view vào bộ đệm của session: dự đoán trước khi trả session cho request khác
+        response = predict_from_coordinates(data_X, frames_with_hands)
+        if frame_archiver is not None and response.get("label"):
+            # Chỉ xếp hàng (không chặn); JPEG gốc được lưu nguyên, tọa độ được copy khỏi bộ đệm
+            frame_archiver.submit(jpeg_frames, response["label"], landmarks=data_X, session_id=session_id)
+        return response
+
+def preview_frames_sync(request):
+    """
+    Same as process_frames_sync, but with the hand skeleton drawn on the frames,
+    which are returned as base64 JPEGs. Debug/visualization only.
+    """
+    frames = extract_frames_from_base64s(request)
+    with processor_pool.request_session(request.session_id) as video_processor:
+        data_X, annotated_frames, frames_with_hands = video_processor.process_video_from_frames(frames, draw_landmarks=True)
+        response = predict_from_coordinates(data_X, frames_with_hands)
+
+    previews = []
+    for frame in annotated_frames:
+        ok, encoded = cv2.imencode('.jpg', frame)
+        if ok:
+            previews.append("data:image/jpeg;base64," + base64.b64encode(encoded.tobytes()).decode('ascii'))
+    return {**response, "frames": previews}
+
+def extract_frame_coordinates(session_id, frame_bytes, frame_format, width, height, out=None):
+    """
+    Decode one streamed frame and extract its hand landmarks on a worker thread.
+
+    :param out: Optional (42, 2) row written in place (LandmarkRingBuffer.next_row()).
+    """
+    if frame_format == "rgb":
+        frame = decode_rgb_bytes(frame_bytes, width, height)
+    else:
+        frame = decode_jpeg_bytes(frame_bytes)
+    with processor_pool.session(session_id) as video_processor:
+        return video_processor._extract_hand_coordinates(frame, out=out)
+
+async def recognize_landmarks(websocket, coordinates, landmark_buffer, recognizer=None):
+    """
+    Feed the landmarks of one frame to a WebSocket connection's state and send
+    a prediction when one is due (shared by /ws/recognize and /ws/landmarks).
+
+    :param coordinates: (42, 2) landmarks of the new frame.
+    :param recognizer: The connection's StreamingRecognizer, or None to use the sliding window.
+    """
+    gate = landmark_buffer.gate
+    if recognizer is not None:
+        if gate is not None:
+            event = gate.update(coordinates)
+            if event == 'start':
+                # Mỗi đoạn ký hiệu bắt đầu từ trạng thái mới; ngoài đoạn không chạy model
+                recognizer.reset()
+            elif event == 'end':
+                await websocket.send_json({"status": "idle", "label": None})
+            if not gate.in_segment:
+                return
+        # Chỉ cập nhật trạng thái LSTM/conv với frame mới: O(1) mỗi frame, không cần cửa sổ.
+        # Chạy trên worker thread như các bước suy luận khác, không chặn event loop
+        try:
+            await worker_pool.run(recognizer.push, coordinates)
+        except WorkerPoolSaturatedError as e:
+            await websocket.send_json({"status": "busy", "detail": str(e)})
+            return
+        except Exception as e:
+            print(f"Lỗi dự đoán: {str(e)}")
+            await websocket.send_json({"status": "error", "detail": str(e)})
+            return
+        # Không gửi xác suất dựa trên quá ít frame (đầu kết nối hoặc đầu đoạn ký hiệu)
+        if recognizer.ready and recognizer.frames_seen % landmark_buffer.stride == 0:
+            has_hand = bool((np.asarray(coordinates) != -1).any())
+            await websocket.send_json(streaming_response(recognizer, has_hand))
+        return
+
+    if landmark_buffer.push(coordinates):
+        landmark_buffer.mark_predicted()
+        try:
+            response = await worker_pool.run(
+                predict_from_coordinates, landmark_buffer.window(), landmark_buffer.frames_with_hands()
+            )
+        except WorkerPoolSaturatedError as e:
+            response = {"status": "busy", "detail": str(e)}
+        except Exception as e:
+            # Lỗi suy luận (backend, model): báo trên kết nối thay vì đóng WebSocket
+            print(f"Lỗi dự đoán: {str(e)}")
+            response = {"status": "error", "detail": str(e)}
+        await websocket.send_json(response)
+    elif landmark_buffer.gate_event == 'end':
+        # Đoạn kết thúc nhưng cửa sổ không đủ frame có tay: báo rảnh thay vì chạy model
+        await websocket.send_json({"status": "idle", "label": None})
+
+@app.get("/api/health")
+async def health():
+    return {
+        "status": "ok",
+        "sessions": len(processor_pool),
+        "workers": worker_pool.stats(),
+        "batching": inference_batcher.stats(),
+        "archive": frame_archiver.stats() if frame_archiver is not None else None
+    }
 
 @app.post("/api/process-frames")
 async def process_frames(request: VideoFramesRequest):
+    """
+    Recognize one complete clip: the request carries its own 60 frames and is
+    predicted on its own (no state is kept between requests). Continuous,
+    overlapping-window recognition is served by /ws/recognize and /ws/landmarks.
+    """
     try:
-        frames = extract_frames_from_base64s(request)
-        data_X, processed_frames, frames_with_hands = video_processor.process_video_from_frames(frames)
-        
-        # Kiểm tra xem có frame nào có bàn tay không
-        if frames_with_hands == 0:
-            print("Không phát hiện bàn tay trong frames")
-            return {"status": "no_hand_detected", "label": None}
-            
-        # Kiểm tra xem có đủ số frame không
-        if len(data_X) < 60:
-            print(f"Chưa đủ frames: {len(data_X)}/60")
-            return {"status": "insufficient_data", "label": None}
-            
-        # Thực hiện dự đoán
-        predicted_index = sign_recognition.predict(data_X)
-        
-        if predicted_index is None:
-            return {"status": "prediction_failed", "label": None}
-            
-        # Lấy label text
-        label = get_label_by_index(predicted_index)
-        print(f"Dự đoán thành công: {label} (có {frames_with_hands}/60 frames chứa bàn tay)")
-
-        return {
-            "status": "success", 
-            "label": label,
-            "frames_with_hands": frames_with_hands
-        }
+        return await worker_pool.run(process_frames_sync, request)
         
+    except (PoolExhaustedError, WorkerPoolSaturatedError) as e:
+        print(f"Hết tài nguyên xử lý: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"{str(e)}")
     except Exception as e:
         print(f"Lỗi xử lý frames: {str(e)}")
         raise HTTPException(status_code=400, detail=f"{str(e)}")
 
+@app.post("/api/preview-frames")
+async def preview_frames(request: VideoFramesRequest):
+    if not ENABLE_PREVIEW:
+        raise HTTPException(status_code=404, detail="Preview đang tắt (VSL_ENABLE_PREVIEW=1 để bật)")
+    try:
+        return await worker_pool.run(preview_frames_sync, request)
+
+    except (PoolExhaustedError, WorkerPoolSaturatedError) as e:
+        print(f"Hết tài nguyên xử lý: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"{str(e)}")
+    except Exception as e:
+        print(f"Lỗi xử lý frames: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"{str(e)}")
+
+@app.websocket("/ws/recognize")
+async def recognize_stream(websocket: WebSocket, session_id: Optional[str] = None):
+    """
+    Streaming recognition: the client sends one frame per binary message and
+    receives predictions as JSON text messages on the same socket.
+
+    Frames are raw JPEG bytes by default. A text message
+    {"type": "config", "format": "rgb", "width": W, "height": H} switches the
+    connection to raw packed RGB frames and may also set "stride";
+    {"type": "reset"} clears the buffer.
+    Each connection gets its own pooled VideoProcessor (the `session_id` query
+    parameter, or a random id), released when the socket closes.
+    Hand landmarks are extracted as soon as each frame arrives into a sliding
+    window, and the model runs every `stride` frames once the window is full.
+    When a streaming model is configured (VSL_STREAMING_MODEL_PATH), each frame
+    instead advances the connection's recurrent state and a per-frame posterior
+    is sent every `stride` frames (default VSL_STREAMING_STRIDE), once it rests on
+    at least half a window (see StreamingRecognizer).
+    With gating enabled (VSL_ENABLE_GATING), the model only runs inside detected
+    sign segments (hand present and moving), plus once when a segment ends, and
+    {"status": "idle"} is sent when a segment ends without a prediction.
+    """
+    await websocket.accept()
+    session_id = session_id or uuid.uuid4().hex
+    frame_format = "jpeg"
+    width = height = 0
+    landmark_buffer = LandmarkRingBuffer(
+        window_size=WINDOW_SIZE,
+        stride=RECOGNITION_STRIDE,
+        gate=segment_gate_factory() if segment_gate_factory is not None else None
+    )
+    recognizer = StreamingRecognizer(streaming_model, window_size=WINDOW_SIZE) if streaming_model is not None else None
+    if recognizer is not None:
+        landmark_buffer.stride = STREAMING_STRIDE
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("text") is not None:
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    await websocket.send_json({"status": "error", "detail": "Tin nhắn điều khiển không hợp lệ"})
+                    continue
+                if control.get("type") == "config":
+                    frame_format = control.get("format", "jpeg")
+                    width = int(control.get("width", 0))
+                    height = int(control.get("height", 0))
+                    if frame_format not in ("jpeg", "rgb"):
+                        await websocket.send_json({"status": "error", "detail": f"Định dạng không hỗ trợ: {frame_format}"})
+                        frame_format = "jpeg"
+                    if "stride" in control:
+                        landmark_buffer.stride = max(1, int(control["stride"]))
+                elif control.get("type") == "reset":
+                    landmark_buffer.reset()
+                    if recognizer is not None:
+                        recognizer.reset()
+                continue
+
+            frame_bytes = message.get("bytes")
+            if not frame_bytes:
+                continue
+
+            try:
+                # Ghi tọa độ thẳng vào hàng kế tiếp của bộ đệm vòng (frame chỉ được ghi nhận khi push)
+                coordinates = await worker_pool.run(
+                    extract_frame_coordinates, session_id, frame_bytes, frame_format, width, height,
+                    landmark_buffer.next_row()
+                )
+            except ValueError as e:
+                await websocket.send_json({"status": "error", "detail": str(e)})
+                continue
+            except (PoolExhaustedError, WorkerPoolSaturatedError) as e:
+                # Quá tải: bỏ frame này thay vì xếp hàng vô hạn
+                await websocket.send_json({"status": "busy", "detail": str(e)})
+                continue
+
+            await recognize_landmarks(websocket, coordinates, landmark_buffer, recognizer)
+
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Lỗi WebSocket nhận dạng: {str(e)}")
+        await websocket.close(code=1011)
+    finally:
+        processor_pool.release(session_id)
+
+@app.websocket("/ws/landmarks")
+async def recognize_landmark_stream(websocket: WebSocket):
+    """
+    Streaming recognition from landmarks extracted on the client.
+
+    The server first sends {"type": "config", "hand_order": ..., "window_size": ...,
+    "values_per_frame": 84, "dtype": "float16"} so the client fills the hand
+    slots the way the model was trained. Each binary message then holds one or
+    more frames of 84 little-endian float16 values ([x, y] of the 42 points in
+    image coordinates, -1 for missing points); predictions come back as JSON
+    text messages, exactly as on /ws/recognize. No VideoProcessor session is
+    used, so the server only runs the model. Text messages
+    {"type": "config", "stride": N} and {"type": "reset"} are also accepted.
+    """
+    await websocket.accept()
+    landmark_buffer = LandmarkRingBuffer(
+        window_size=WINDOW_SIZE,
+        stride=RECOGNITION_STRIDE,
+        gate=segment_gate_factory() if segment_gate_factory is not None else None
+    )
+    recognizer = StreamingRecognizer(streaming_model, window_size=WINDOW_SIZE) if streaming_model is not None else None
+    if recognizer is not None:
+        landmark_buffer.stride = STREAMING_STRIDE
+
+    try:
+        await websocket.send_json({
+            "type": "config",
+            "hand_order": feature_config['hand_order'],
+            "window_size": WINDOW_SIZE,
+            "values_per_frame": LANDMARK_VALUES_PER_FRAME,
+            "dtype": "float16"
+        })
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("text") is not None:
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    await websocket.send_json({"status": "error", "detail": "Tin nhắn điều khiển không hợp lệ"})
+                    continue
+                if control.get("type") == "config" and "stride" in control:
+                    landmark_buffer.stride = max(1, int(control["stride"]))
+                elif control.get("type") == "reset":
+                    landmark_buffer.reset()
+                    if recognizer is not None:
+                        recognizer.reset()
+                continue
+
+            landmark_bytes = message.get("bytes")
+            if not landmark_bytes:
+                continue
+            try:
+                frames = decode_landmark_bytes(landmark_bytes)
+            except ValueError as e:
+                await websocket.send_json({"status": "error", "detail": str(e)})
+                continue
+
+            for coordinates in frames:
+                await recognize_landmarks(websocket, coordinates, landmark_buffer, recognizer)
+
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Lỗi WebSocket tọa độ: {str(e)}")
+        await websocket.close(code=1011)
+
+@app.on_event("shutdown")
+def close_processor_pool():
+    worker_pool.shutdown(wait=False)
+    inference_batcher.close()
+    processor_pool.close()
+    if frame_archiver is not None:
+        frame_archiver.close()
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
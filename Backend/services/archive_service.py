@@ -0,0 +1,148 @@
+import io
+import json
+import os
+import queue
+import random
+import threading
+import zipfile
+from datetime import datetime
+
+import numpy as np
+
+class FrameArchiver:
+    def __init__(self, root_dir='saved_frames', max_queue=64, sample_rate=1.0, pack=True):
+        """
+        Background writer that archives received clips for later retraining.
+
+        Clips are queued without blocking and written by one worker thread; the
+        JPEG bytes are stored exactly as received (no decode / re-encode). When
+        the queue is full the clip is dropped and counted instead of slowing the
+        request down.
+
+        :param root_dir: Folder receiving one archive (or folder) per clip.
+        :param max_queue: Clips waiting to be written before new ones are dropped.
+        :param sample_rate: Fraction of submitted clips that are archived (0..1).
+        :param pack: Write each clip as a single .zip (frames + landmarks.npy + meta.json)
+                     instead of a folder of files.
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.root_dir = root_dir
+        self.sample_rate = sample_rate
+        self.pack = pack
+        self.submitted = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.written = 0
+        self.errors = 0
+        self.bytes_written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='vsl-archiver', daemon=True)
+        self._thread.start()
+
+    def submit(self, jpeg_frames, label, landmarks=None, session_id=None):
+        """
+        Queue one clip; never blocks.
+
+        :param jpeg_frames: List of encoded JPEG frames (bytes).
+        :param label: Predicted label, used in the clip name.
+        :param landmarks: Optional (frames, 42, 2) array; copied, so buffer views are safe to pass.
+        :param session_id: Optional session id stored in the metadata.
+        :return: True if the clip was queued, False if it was sampled out or dropped.
+        """
+        with self._lock:
+            self.submitted += 1
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                self.sampled_out += 1
+                return False
+
+        clip = {
+            'frames': list(jpeg_frames),
+            'label': label,
+            'landmarks': None if landmarks is None else np.array(landmarks, dtype=np.float32),
+            'session_id': session_id,
+            'timestamp': datetime.now(),
+        }
+        try:
+            self._queue.put_nowait(clip)
+        except queue.Full:
+            # Bộ ghi không theo kịp: bỏ clip thay vì làm chậm request
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "sampled_out": self.sampled_out,
+                "dropped": self.dropped,
+                "written": self.written,
+                "errors": self.errors,
+                "bytes_written": self.bytes_written,
+                "queued": self._queue.qsize(),
+            }
+
+    def close(self):
+        """
+        Write the clips still queued, then stop the worker.
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            clip = self._queue.get()
+            if clip is None:
+                return
+            try:
+                size = self._write_clip(clip)
+                with self._lock:
+                    self.written += 1
+                    self.bytes_written += size
+            except Exception as e:
+                print(f"Lỗi lưu clip: {str(e)}")
+                with self._lock:
+                    self.errors += 1
+
+    def _write_clip(self, clip):
+        # Tên theo định dạng yyyy-mm-dd_hhmmss_ffffff_label (micro giây tránh trùng tên)
+        name = f"{clip['timestamp'].strftime('%Y-%m-%d_%H%M%S_%f')}_{clip['label']}"
+        meta = {
+            'label': clip['label'],
+            'session_id': clip['session_id'],
+            'timestamp': clip['timestamp'].isoformat(),
+            'num_frames': len(clip['frames']),
+        }
+
+        if self.pack:
+            path = os.path.join(self.root_dir, name + '.zip')
+            tmp_path = path + '.tmp'
+            # JPEG đã nén sẵn: lưu nguyên (ZIP_STORED) để không tốn CPU nén lại
+            with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+                for idx, frame in enumerate(clip['frames']):
+                    archive.writestr(f"frame_{idx:03d}.jpg", frame)
+                if clip['landmarks'] is not None:
+                    buffer = io.BytesIO()
+                    np.save(buffer, clip['landmarks'])
+                    archive.writestr('landmarks.npy', buffer.getvalue())
+                archive.writestr('meta.json', json.dumps(meta))
+            os.replace(tmp_path, path)
+            return os.path.getsize(path)
+
+        folder = os.path.join(self.root_dir, name)
+        os.makedirs(folder, exist_ok=True)
+        size = 0
+        for idx, frame in enumerate(clip['frames']):
+            with open(os.path.join(folder, f"frame_{idx:03d}.jpg"), 'wb') as file:
+                file.write(frame)
+            size += len(frame)
+        if clip['landmarks'] is not None:
+            np.save(os.path.join(folder, 'landmarks.npy'), clip['landmarks'])
+            size += clip['landmarks'].nbytes
+        with open(os.path.join(folder, 'meta.json'), 'w', encoding='utf-8') as file:
+            json.dump(meta, file)
+        return size
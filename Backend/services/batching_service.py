@@ -0,0 +1,133 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+class BatcherClosedError(RuntimeError):
+    """Raised for windows submitted to (or still queued in) a closed InferenceBatcher."""
+
+class InferenceBatcher:
+    def __init__(self, predict_batch, max_batch_size=32, max_wait_ms=10, window_shape=None):
+        """
+        Dynamic micro-batching in front of the recognition model.
+
+        Windows submitted from concurrent sessions are collected for at most
+        `max_wait_ms` (or until `max_batch_size` are pending), run through one
+        batched forward pass, and each caller gets back its own row of results.
+
+        :param predict_batch: Callable taking a (batch, timesteps, features) array
+                              and returning one result row per window, e.g.
+                              SignRecognition.predict_proba_batch.
+        :param max_batch_size: Largest batch sent to the model.
+        :param max_wait_ms: Time budget for filling a batch after its first window.
+        :param window_shape: Expected (timesteps, features) of every window; windows of
+                             another shape are rejected on submit so they cannot fail
+                             the batch they would be stacked with. None disables the check.
+        """
+        self.predict_batch = predict_batch
+        self.window_shape = tuple(window_shape) if window_shape is not None else None
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches_run = 0
+        self.windows_run = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._closed_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='vsl-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, window):
+        """
+        Queue one prepared window (timesteps, features).
+
+        :return: concurrent.futures.Future resolving to the window's result row; it
+                 fails with ValueError for a window of the wrong shape and with
+                 BatcherClosedError once the batcher is closed.
+        """
+        future = Future()
+        if self.window_shape is not None and np.shape(window) != self.window_shape:
+            future.set_exception(ValueError(
+                f"Expected a window of shape {self.window_shape}, got {np.shape(window)}"
+            ))
+            return future
+        with self._closed_lock:
+            if self._closed:
+                future.set_exception(BatcherClosedError("Inference batcher is closed"))
+                return future
+            self._queue.put((window, future))
+        return future
+
+    def predict(self, window):
+        """
+        Blocking helper: submit a window and wait for its result row.
+        """
+        return self.submit(window).result()
+
+    def stats(self):
+        return {
+            "batches": self.batches_run,
+            "windows": self.windows_run,
+            "mean_batch_size": self.windows_run / self.batches_run if self.batches_run else 0.0,
+        }
+
+    def close(self):
+        """
+        Run the windows already queued, then stop the worker; later submissions fail.
+        """
+        with self._closed_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+        # Không còn luồng xử lý: các future còn trong hàng đợi phải được báo lỗi thay vì chờ mãi
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(BatcherClosedError("Inference batcher is closed"))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._run_batch(batch)
+            if stopping:
+                return
+
+    def _run_batch(self, batch):
+        futures = [future for _, future in batch]
+        try:
+            results = self.predict_batch(np.stack([window for window, _ in batch]))
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.windows_run += len(batch)
+        for future, result in zip(futures, results):
+            future.set_result(result)
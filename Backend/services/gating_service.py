@@ -0,0 +1,121 @@
+import numpy as np
+
+try:
+    from Backend.preparation.features import NUM_POINTS
+except ImportError:
+    from preparation.features import NUM_POINTS
+
+def motion_energy(landmarks):
+    """
+    Frame-to-frame landmark motion of a sequence.
+
+    For every pair of consecutive frames this is the mean displacement (in
+    normalized image units) of the points present in both frames, 0 when no
+    point is present in both.
+
+    :param landmarks: Array of shape (timesteps, 84) or (timesteps, 42, 2), -1 for missing points.
+    :return: float32 array of shape (timesteps - 1,).
+    """
+    points = np.asarray(landmarks, dtype=np.float32).reshape(-1, NUM_POINTS, 2)
+    present = np.all(points != -1, axis=-1)
+    both_present = present[1:] & present[:-1]
+    displacement = np.linalg.norm(points[1:] - points[:-1], axis=-1)
+    moving = np.where(both_present, displacement, 0.0).sum(axis=-1)
+    return (moving / np.maximum(both_present.sum(axis=-1), 1)).astype(np.float32)
+
+class SegmentGate:
+    def __init__(self, min_hand_ratio=0.3, motion_threshold=0.004, start_frames=3, end_frames=8):
+        """
+        Decide when the recognition model is worth running.
+
+        A frame is active when a hand is present and its landmarks moved by at
+        least `motion_threshold` since the previous frame. A sign segment starts
+        after `start_frames` consecutive active frames and ends after `end_frames`
+        consecutive inactive ones (hand gone or held still), so short holds
+        inside a sign do not split it. Windows also need hands in at least
+        `min_hand_ratio` of their frames.
+
+        Frame counts and the threshold are per received frame, so they depend on
+        the client's frame rate.
+
+        :param min_hand_ratio: Minimum fraction of window frames with a hand (0..1).
+        :param motion_threshold: Mean landmark displacement for a frame to count as moving.
+        :param start_frames: Consecutive active frames that open a segment.
+        :param end_frames: Consecutive inactive frames that close it.
+        """
+        if not 0.0 <= min_hand_ratio <= 1.0:
+            raise ValueError("min_hand_ratio must be between 0 and 1")
+        if start_frames < 1 or end_frames < 1:
+            raise ValueError("start_frames and end_frames must be at least 1")
+        self.min_hand_ratio = min_hand_ratio
+        self.motion_threshold = motion_threshold
+        self.start_frames = start_frames
+        self.end_frames = end_frames
+        self.previous = np.full((NUM_POINTS, 2), -1, dtype=np.float32)
+        self.reset()
+
+    def update(self, coordinates, has_hand=None):
+        """
+        Advance the segment state with one frame.
+
+        :param coordinates: 42 [x, y] pairs of the new frame, -1 for missing points.
+        :param has_hand: Whether the frame contains a hand; derived from the coordinates when not given.
+        :return: 'start' or 'end' when a segment boundary is reached on this frame, else None.
+        """
+        current = np.asarray(coordinates, dtype=np.float32).reshape(NUM_POINTS, 2)
+        if has_hand is None:
+            has_hand = bool((current != -1).any())
+        self.energy = float(motion_energy(np.stack((self.previous, current)))[0])
+        self.previous[:] = current
+
+        if has_hand and self.energy >= self.motion_threshold:
+            self.active_run += 1
+            self.idle_run = 0
+        else:
+            self.idle_run += 1
+            self.active_run = 0
+
+        if not self.in_segment:
+            if self.active_run >= self.start_frames:
+                self.in_segment = True
+                self.segment_frames = self.active_run
+                return 'start'
+            return None
+
+        self.segment_frames += 1
+        if self.idle_run >= self.end_frames:
+            self.in_segment = False
+            return 'end'
+        return None
+
+    def has_coverage(self, frames_with_hands, num_frames):
+        return frames_with_hands > 0 and frames_with_hands >= self.min_hand_ratio * num_frames
+
+    def check_window(self, window, frames_with_hands=None):
+        """
+        Stateless check of a complete window (e.g. the 60 frames of an HTTP request).
+
+        :param window: Landmarks of shape (timesteps, 84) or (timesteps, 42, 2).
+        :param frames_with_hands: Number of frames with a hand; computed when not given.
+        :return: None if the window is a candidate sign segment, otherwise the
+                 response status explaining why it was skipped
+                 ('no_hand_detected' or 'idle').
+        """
+        window = np.asarray(window, dtype=np.float32)
+        num_frames = len(window)
+        if frames_with_hands is None:
+            frames_with_hands = int(np.any(window.reshape(num_frames, -1) != -1, axis=1).sum())
+        if not self.has_coverage(frames_with_hands, num_frames):
+            return 'no_hand_detected'
+        # Cần ít nhất start_frames frame chuyển động, như khi mở một đoạn ký hiệu
+        if int((motion_energy(window) >= self.motion_threshold).sum()) < self.start_frames:
+            return 'idle'
+        return None
+
+    def reset(self):
+        self.previous.fill(-1)
+        self.energy = 0.0
+        self.active_run = 0
+        self.idle_run = 0
+        self.in_segment = False
+        self.segment_frames = 0
@@ -0,0 +1,149 @@
+import threading
+
+import numpy as np
+
+class KerasBackend:
+    def __init__(self, keras_model, input_shape=(60, 84)):
+        """
+        Run the full Keras model through TensorFlow.
+
+        :param keras_model: Loaded Keras model (CNNLSTMModel.model).
+        :param input_shape: (timesteps, features) of one window.
+        """
+        self.model = keras_model
+        self.input_shape = input_shape
+        self._compiled_forward = None
+
+    def enable_fast_path(self, warmup_batch_sizes=(1,)):
+        """
+        Switch inference to a traced tf.function with a fixed input signature.
+
+        model.predict builds a data pipeline and callbacks on every call, which
+        dominates the cost for a single (1, 60, 84) window. The compiled function
+        is traced once here and warmed up with dummy batches so the first real
+        request does not pay for tracing.
+
+        :param warmup_batch_sizes: Batch sizes to run once at startup.
+        """
+        import tensorflow as tf
+
+        timesteps, features = self.input_shape
+        model = self.model
+
+        @tf.function(input_signature=[tf.TensorSpec(shape=(None, timesteps, features), dtype=tf.float32)])
+        def forward(batch_X):
+            return model(batch_X, training=False)
+
+        self._compiled_forward = forward
+        for batch_size in warmup_batch_sizes:
+            forward(tf.zeros((batch_size, timesteps, features), dtype=tf.float32))
+
+    def predict_proba_batch(self, batch_X):
+        if self._compiled_forward is not None:
+            return self._compiled_forward(np.asarray(batch_X, dtype=np.float32)).numpy()
+        # predict_on_batch tránh chi phí dựng pipeline dữ liệu của model.predict
+        return np.asarray(self.model.predict_on_batch(batch_X))
+
+class TFLiteBackend:
+    def __init__(self, model_path, num_threads=None):
+        """
+        Run an exported .tflite model (see CNNLSTMModel.export_tflite).
+
+        Uses the standalone `tflite_runtime` interpreter when installed so the
+        server does not need to import TensorFlow at all, and falls back to
+        tf.lite otherwise.
+
+        :param model_path: Path to the .tflite file.
+        :param num_threads: Interpreter threads (None lets TFLite decide).
+        """
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.model_path = model_path
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        # export_tflite cố định batch 1 (LSTM hợp nhất không đổi được kích thước batch): chạy từng hàng
+        self._fixed_batch = int(self._input.get('shape_signature', self._input['shape'])[0]) != -1
+        # Interpreter không thread-safe
+        self._lock = threading.Lock()
+        print(f"TFLite model loaded from {model_path}")
+
+    def predict_proba_batch(self, batch_X):
+        batch_X = self._quantize_input(np.asarray(batch_X, dtype=np.float32))
+        with self._lock:
+            if self._fixed_batch and batch_X.shape[0] != self._batch_size:
+                rows = [
+                    self._invoke(batch_X[start:start + self._batch_size])
+                    for start in range(0, batch_X.shape[0], self._batch_size)
+                ]
+                output = np.concatenate(rows)
+            else:
+                if batch_X.shape[0] != self._batch_size:
+                    self.interpreter.resize_tensor_input(self._input['index'], batch_X.shape)
+                    self.interpreter.allocate_tensors()
+                    self._batch_size = batch_X.shape[0]
+                output = self._invoke(batch_X)
+        return self._dequantize_output(output)
+
+    def _invoke(self, batch_X):
+        self.interpreter.set_tensor(self._input['index'], batch_X)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output['index']).copy()
+
+    def _quantize_input(self, batch_X):
+        if self._input['dtype'] == np.float32:
+            return batch_X
+        scale, zero_point = self._input['quantization']
+        info = np.iinfo(self._input['dtype'])
+        return np.clip(np.round(batch_X / scale + zero_point), info.min, info.max).astype(self._input['dtype'])
+
+    def _dequantize_output(self, output):
+        if self._output['dtype'] == np.float32:
+            return output
+        scale, zero_point = self._output['quantization']
+        return (output.astype(np.float32) - zero_point) * scale
+
+class ONNXBackend:
+    def __init__(self, model_path, num_threads=None):
+        """
+        Run an exported .onnx model (see CNNLSTMModel.export_onnx) with onnxruntime.
+
+        :param model_path: Path to the .onnx file.
+        :param num_threads: Intra-op threads (None lets onnxruntime decide).
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("onnxruntime is required for the ONNX backend: pip install onnxruntime") from e
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.model_path = model_path
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self._input_name = self.session.get_inputs()[0].name
+        print(f"ONNX model loaded from {model_path}")
+
+    def predict_proba_batch(self, batch_X):
+        batch_X = np.asarray(batch_X, dtype=np.float32)
+        return self.session.run(None, {self._input_name: batch_X})[0]
+
+def create_backend(kind, model_path, num_threads=None):
+    """
+    Build a lightweight backend for an exported model file.
+
+    :param kind: 'tflite' or 'onnx'.
+    :param model_path: Path to the exported model.
+    :param num_threads: Interpreter threads.
+    """
+    if kind == 'tflite':
+        return TFLiteBackend(model_path, num_threads=num_threads)
+    if kind == 'onnx':
+        return ONNXBackend(model_path, num_threads=num_threads)
+    raise ValueError(f"Unknown inference backend: {kind}")
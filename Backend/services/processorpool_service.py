@@ -0,0 +1,158 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from Backend.services.videoprocess_service import VideoProcessor
+
+class PoolExhaustedError(RuntimeError):
+    """Raised when every pooled processor is busy and no idle one can be evicted."""
+
+class _PooledProcessor:
+    def __init__(self, processor=None):
+        self.processor = processor  # Tạo khi session dùng lần đầu, ngoài khóa của pool
+        self.lock = threading.Lock()  # Hands không thread-safe: một request mỗi lúc
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+class VideoProcessorPool:
+    def __init__(self, max_size=16, idle_timeout=300, processor_factory=VideoProcessor, max_idle_anonymous=2):
+        """
+        Pool of VideoProcessor instances keyed by session id.
+
+        MediaPipe Hands in tracking mode keeps temporal state and is not
+        thread-safe, so each session (meeting participant) gets its own instance.
+        Sessions idle for longer than `idle_timeout` seconds are closed, and when
+        the pool is full the least recently used idle session is evicted.
+
+        :param max_size: Maximum number of live processors.
+        :param idle_timeout: Seconds after which an unused session is closed.
+        :param processor_factory: Callable creating a new processor.
+        :param max_idle_anonymous: Processors kept for reuse by requests without a session id.
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.processor_factory = processor_factory
+        self.max_idle_anonymous = max_idle_anonymous
+        self._sessions = OrderedDict()
+        self._idle_anonymous = []  # session id của các processor ẩn danh đang rảnh
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self, session_id):
+        """
+        Borrow the processor of `session_id`, creating it if needed.
+
+        Requests of the same session are serialized; different sessions run in parallel.
+
+        :raises PoolExhaustedError: If the pool is full of busy sessions.
+        """
+        entry = self._checkout(session_id)
+        try:
+            with entry.lock:
+                # Tạo MediaPipe Hands dưới khóa của session, không chặn các session khác
+                if entry.processor is None:
+                    entry.processor = self.processor_factory()
+                yield entry.processor
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    @contextmanager
+    def request_session(self, session_id=None):
+        """
+        Borrow a processor for one HTTP request.
+
+        With a session id this is session(); without one the request borrows an idle
+        anonymous processor, or a new one (counted against max_size), so anonymous
+        requests run in parallel instead of queuing on one shared session. Up to
+        `max_idle_anonymous` of them are kept for the next requests, the rest are closed.
+        """
+        if session_id:
+            with self.session(session_id) as processor:
+                yield processor
+            return
+
+        with self._lock:
+            session_id = self._idle_anonymous.pop() if self._idle_anonymous else f"request-{uuid.uuid4().hex}"
+        try:
+            with self.session(session_id) as processor:
+                yield processor
+        finally:
+            with self._lock:
+                keep = session_id in self._sessions and len(self._idle_anonymous) < self.max_idle_anonymous
+                if keep:
+                    self._idle_anonymous.append(session_id)
+            if not keep:
+                self.release(session_id)
+
+    def release(self, session_id):
+        """
+        Close the processor of a finished session (e.g. a closed WebSocket).
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry.in_use:
+                return
+            del self._sessions[session_id]
+        self._close_entry(entry)
+
+    def close(self):
+        with self._lock:
+            entries = list(self._sessions.values())
+            self._sessions.clear()
+            self._idle_anonymous.clear()
+        for entry in entries:
+            self._close_entry(entry)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _checkout(self, session_id):
+        evicted = []
+        try:
+            with self._lock:
+                evicted = self._pop_idle_sessions()
+
+                entry = self._sessions.get(session_id)
+                if entry is not None:
+                    self._sessions.move_to_end(session_id)
+                else:
+                    if len(self._sessions) >= self.max_size:
+                        evicted.append(self._pop_least_recently_used())
+                    # Chỉ giữ chỗ; processor được tạo trong session() sau khi nhả khóa
+                    entry = _PooledProcessor()
+                    self._sessions[session_id] = entry
+                entry.in_use += 1
+        finally:
+            # Các session đã bị lấy khỏi pool phải được đóng kể cả khi pool đầy (PoolExhaustedError)
+            for old_entry in evicted:
+                self._close_entry(old_entry)
+        return entry
+
+    @staticmethod
+    def _close_entry(entry):
+        if entry.processor is not None:
+            entry.processor.close()
+
+    def _pop_idle_sessions(self):
+        now = time.monotonic()
+        expired = [
+            session_id for session_id, entry in self._sessions.items()
+            if not entry.in_use and now - entry.last_used > self.idle_timeout
+        ]
+        return [self._pop_session(session_id) for session_id in expired]
+
+    def _pop_least_recently_used(self):
+        # OrderedDict giữ thứ tự sử dụng: phần tử đầu là session cũ nhất
+        for session_id, entry in self._sessions.items():
+            if not entry.in_use:
+                return self._pop_session(session_id)
+        raise PoolExhaustedError(f"All {self.max_size} processor sessions are busy")
+
+    def _pop_session(self, session_id):
+        if session_id in self._idle_anonymous:
+            self._idle_anonymous.remove(session_id)
+        return self._sessions.pop(session_id)
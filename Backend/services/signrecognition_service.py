@@ -1,42 +1,109 @@
 import numpy as np
-import tensorflow as tf
-from keras.models import load_model # type: ignore
 import json
 
+try:
+    from Backend.services.inference_backends import KerasBackend
+    from Backend.preparation.features import LEGACY_FEATURE_CONFIG, compute_features, feature_dim
+except ImportError:
+    from inference_backends import KerasBackend
+    from preparation.features import LEGACY_FEATURE_CONFIG, compute_features, feature_dim
+
 class SignRecognition:
-    def __init__(self, cnn_lstm_model, input_shape=(60, 42, 2), num_classes=3):
-        self.model = cnn_lstm_model.model
+    def __init__(self, cnn_lstm_model=None, input_shape=(60, 42, 2), num_classes=3, fast_path=False, backend=None,
+                 feature_config=None):
+        """
+        :param cnn_lstm_model: CNNLSTMModel served through TensorFlow (ignored when `backend` is given).
+        :param backend: Object exposing predict_proba_batch, e.g. a TFLiteBackend or
+                        ONNXBackend from inference_backends, to serve an exported model
+                        without loading Keras.
+        :param feature_config: Feature config saved with the model (features.load_feature_config);
+                               None means raw coordinates.
+        """
+        self.feature_config = feature_config or dict(LEGACY_FEATURE_CONFIG)
+        # Kích thước một cửa sổ đầu vào của model (timesteps, features)
+        self.window_shape = (input_shape[0], feature_dim(self.feature_config))
+        if backend is None:
+            if cnn_lstm_model is None:
+                raise ValueError("Either cnn_lstm_model or backend is required")
+            backend = KerasBackend(cnn_lstm_model.model, input_shape=self.window_shape)
+        self.backend = backend
         self.input_shape = input_shape
         self.num_classes = num_classes
+        if fast_path:
+            self.enable_fast_path()
+
+    def enable_fast_path(self, warmup_batch_sizes=(1,)):
+        """
+        Use the compiled tf.function path of the Keras backend (no-op for exported backends).
+        """
+        if isinstance(self.backend, KerasBackend):
+            self.backend.enable_fast_path(warmup_batch_sizes)
 
     def predict(self, data_X):
         """
         Takes the processed hand coordinates and predicts the label using the model.
         Returns None if there's not enough valid data.
         
-        :param data_X: List of hand coordinates
+        :param data_X: List or array of hand coordinates
         :return: Predicted label index (integer) or None if invalid data
         """
-        # Kiểm tra xem có đủ dữ liệu không
-        if not data_X or len(data_X) < self.input_shape[0]:
+        data_X = self.prepare_input(data_X)
+        if data_X is None:
             return None
-            
-        data_X = np.array(data_X)
-        # Chuyển đổi dữ liệu sang float32 và reshape cho CNN-LSTM
-        data_X = np.array(data_X, dtype=np.float32).reshape(data_X.shape[0], -1)
 
         # Thêm chiều batch
         data_X = np.expand_dims(data_X, axis=0)
         
         # Dự đoán
-        predictions = self.model.predict(data_X)
+        predictions = self.predict_proba_batch(data_X)
         predicted_index = np.argmax(predictions)
         
         return predicted_index
+
+    def prepare_input(self, data_X):
+        """
+        Convert one window of hand coordinates to the model input layout.
+
+        :param data_X: List or array of hand coordinates, one entry per frame; only the
+                       last `input_shape[0]` frames are used when there are more.
+        :return: float32 array of shape (timesteps, features) or None if there are too few frames
+        """
+        # Kiểm tra xem có đủ dữ liệu không
+        if data_X is None or len(data_X) < self.input_shape[0]:
+            return None
+
+        # Chuyển tọa độ thô (timesteps, 42, 2) của cửa sổ mới nhất thành đặc trưng của model (timesteps, features)
+        return compute_features(data_X[-self.input_shape[0]:], self.feature_config)
+
+    def predict_proba_batch(self, batch_X):
+        """
+        Run one forward pass over a batch of prepared windows.
+
+        :param batch_X: float32 array of shape (batch, timesteps, features)
+        :return: Class probabilities of shape (batch, num_classes)
+        """
+        return self.backend.predict_proba_batch(batch_X)
+
+    def predict_top_k(self, data_X, k=3):
+        """
+        Predict the k most likely labels for one window.
+
+        :param data_X: List or array of hand coordinates
+        :param k: Number of labels to return
+        :return: List of (label index, probability) sorted by probability, or None if invalid data
+        """
+        data_X = self.prepare_input(data_X)
+        if data_X is None:
+            return None
+
+        probabilities = self.predict_proba_batch(np.expand_dims(data_X, axis=0))[0]
+        top_indices = np.argsort(probabilities)[::-1][:k]
+        return [(int(index), float(probabilities[index])) for index in top_indices]
     
 if __name__ == "__main__":
     from videoprocess_service import VideoProcessor
     from preparation.modeling import CNNLSTMModel # test
+    from preparation.features import load_feature_config
 
     with open('../dataset/labels.json', 'r', encoding='utf-8') as file:
         labels_json = json.load(file)
@@ -44,15 +111,17 @@ if __name__ == "__main__":
     num_classes = len(labels_json)
     # Path to the pre-trained model
     model_path = '../preparation/results/best.keras'
-    cnn_lstm_model = CNNLSTMModel(input_shape=(60, 84), num_classes=num_classes)
+    # Cấu hình đặc trưng lưu cạnh model: thứ tự bàn tay và đặc trưng phải trùng với lúc huấn luyện
+    feature_config = load_feature_config(model_path)
+    cnn_lstm_model = CNNLSTMModel(input_shape=(60, feature_dim(feature_config)), num_classes=num_classes)
     cnn_lstm_model.load_model_from_file(model_path)
 
     # Initialize the VideoProcessor and SignRecognition
-    video_processor = VideoProcessor()
+    video_processor = VideoProcessor(hand_order=feature_config['hand_order'])
     data_X, frames = video_processor.process_video_from_path('../test.mp4')
 
     # Initialize the SignRecognition class with the model path
-    sign_recognition = SignRecognition(cnn_lstm_model)
+    sign_recognition = SignRecognition(cnn_lstm_model, num_classes=num_classes, feature_config=feature_config)
     # Predict the sign label from the processed coordinates
     predicted_index = sign_recognition.predict(data_X)
 
@@ -0,0 +1,98 @@
+import numpy as np
+
+class LandmarkRingBuffer:
+    def __init__(self, window_size=60, num_features=84, stride=10, gate=None):
+        """
+        Fixed-size ring buffer of per-frame landmark rows for continuous recognition.
+
+        Each pushed frame overwrites the oldest row, so MediaPipe only ever runs on
+        the newest frame and the model sees overlapping windows instead of disjoint
+        60-frame chunks.
+
+        :param window_size: Number of frames fed to the model (timesteps).
+        :param num_features: Values per frame (42 points x 2 coordinates).
+        :param stride: Number of new frames between two predictions.
+        :param gate: Optional SegmentGate (services/gating_service). Predictions are
+                     then only due inside sign segments with enough hand coverage,
+                     plus one when a segment ends.
+        """
+        if stride < 1:
+            raise ValueError("stride must be at least 1")
+        self.window_size = window_size
+        self.num_features = num_features
+        self.stride = stride
+        self.buffer = np.full((window_size, num_features), -1, dtype=np.float32)
+        self.hand_mask = np.zeros(window_size, dtype=bool)
+        self.position = 0  # Vị trí sẽ ghi frame tiếp theo (cũng là frame cũ nhất)
+        self.count = 0
+        self.frames_since_predict = 0
+        self.gate = gate
+        self.gate_event = None  # 'start' / 'end' của đoạn ký hiệu ở frame vừa push
+
+    def push(self, coordinates, has_hand=None):
+        """
+        Append the landmarks of one frame.
+
+        :param coordinates: 42 [x, y] pairs (list or array), -1 for missing points.
+        :param has_hand: Whether the frame contains a hand; derived from the
+                         coordinates when not given.
+        :return: True when a prediction is due (window full and `stride` new frames).
+        """
+        row = self.buffer[self.position]
+        if not (isinstance(coordinates, np.ndarray) and np.may_share_memory(coordinates, row)):
+            row[:] = np.asarray(coordinates, dtype=np.float32).reshape(-1)
+        if has_hand is None:
+            has_hand = bool((row != -1).any())
+        self.hand_mask[self.position] = has_hand
+
+        self.position = (self.position + 1) % self.window_size
+        self.count = min(self.count + 1, self.window_size)
+        self.frames_since_predict += 1
+        if self.gate is not None:
+            self.gate_event = self.gate.update(row, has_hand)
+        return self.is_ready()
+
+    def next_row(self):
+        """
+        View of the row the next push() will write, shaped (42, 2), so landmarks can be
+        extracted straight into the buffer; push() it afterwards to commit the frame.
+        """
+        return self.buffer[self.position].reshape(-1, 2)
+
+    def is_ready(self):
+        if self.count < self.window_size:
+            return False
+        if self.gate is None:
+            return self.frames_since_predict >= self.stride
+        if not self.gate.has_coverage(self.frames_with_hands(), self.window_size):
+            return False
+        # Dự đoán theo stride trong đoạn ký hiệu và một lần khi đoạn vừa kết thúc; bỏ qua khi đứng yên
+        if self.gate_event == 'end':
+            return True
+        return self.gate.in_segment and self.frames_since_predict >= self.stride
+
+    def window(self):
+        """
+        Return the buffered frames in chronological order.
+
+        :return: Array of shape (window_size, num_features), oldest frame first.
+        """
+        if self.position == 0:
+            return self.buffer.copy()
+        return np.concatenate((self.buffer[self.position:], self.buffer[:self.position]))
+
+    def frames_with_hands(self):
+        return int(self.hand_mask.sum())
+
+    def mark_predicted(self):
+        self.frames_since_predict = 0
+
+    def reset(self):
+        self.buffer.fill(-1)
+        self.hand_mask.fill(False)
+        self.position = 0
+        self.count = 0
+        self.frames_since_predict = 0
+        self.gate_event = None
+        if self.gate is not None:
+            self.gate.reset()
@@ -0,0 +1,180 @@
+import json
+import numpy as np
+
+try:
+    from Backend.preparation.features import NUM_POINTS, compute_features, feature_dim, load_feature_config
+except ImportError:
+    from preparation.features import NUM_POINTS, compute_features, feature_dim, load_feature_config
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def _activate(x, activation):
+    if activation == 'relu':
+        return np.maximum(x, 0.0)
+    if activation == 'softmax':
+        e = np.exp(x - x.max())
+        return e / e.sum()
+    if activation == 'linear':
+        return x
+    raise ValueError(f"Unsupported activation: {activation}")
+
+class StreamingModel:
+    def __init__(self, weights_path):
+        """
+        Frame-by-frame NumPy runtime for a StreamingCNNLSTMModel
+        (see preparation/streaming_model.export_streaming_weights).
+
+        The weights are shared and read-only; every stream keeps its own state
+        from initial_state(), so one StreamingModel can serve all sessions.
+
+        :param weights_path: Path to the exported .npz file; the feature config saved
+                             next to it (streaming.features.json) is loaded too.
+        """
+        data = np.load(weights_path)
+        meta = json.loads(str(data['spec']))
+        self.num_features = meta['num_features']
+        self.num_classes = meta['num_classes']
+        self.feature_config = load_feature_config(weights_path)
+        if feature_dim(self.feature_config) != self.num_features:
+            raise ValueError(f"Feature config of {weights_path} gives {feature_dim(self.feature_config)} "
+                             f"features, the model expects {self.num_features}")
+        self.layers = []
+        for i, layer in enumerate(meta['layers']):
+            kind = layer['type']
+            if kind == 'conv1d':
+                kernel = data[f'{i}_kernel']  # (kernel_size, in, out)
+                layer = dict(layer, kernel=kernel, bias=data[f'{i}_bias'],
+                             history=(kernel.shape[0] - 1) * layer['dilation'], in_features=kernel.shape[1])
+            elif kind == 'batchnorm':
+                # BatchNorm lúc suy luận là một phép affine cố định
+                scale = data[f'{i}_gamma'] / np.sqrt(data[f'{i}_variance'] + layer['epsilon'])
+                layer = dict(layer, scale=scale, shift=data[f'{i}_beta'] - data[f'{i}_mean'] * scale)
+            elif kind == 'lstm':
+                layer = dict(layer, kernel=data[f'{i}_kernel'], recurrent_kernel=data[f'{i}_recurrent_kernel'], bias=data[f'{i}_bias'])
+            elif kind == 'dense':
+                layer = dict(layer, kernel=data[f'{i}_kernel'], bias=data[f'{i}_bias'])
+            elif kind != 'identity':
+                raise ValueError(f"Unknown streaming layer: {kind}")
+            self.layers.append(layer)
+        print(f"Streaming model loaded from {weights_path}")
+
+    def initial_state(self):
+        """
+        Fresh per-stream state: the last inputs of each causal conv (zeros, as
+        Keras causal padding) and (h, c) of each LSTM.
+        """
+        state = []
+        for layer in self.layers:
+            if layer['type'] == 'conv1d':
+                state.append(np.zeros((layer['history'], layer['in_features']), dtype=np.float32))
+            elif layer['type'] == 'lstm':
+                state.append((np.zeros(layer['units'], dtype=np.float32), np.zeros(layer['units'], dtype=np.float32)))
+            else:
+                state.append(None)
+        return state
+
+    def step(self, frame, state):
+        """
+        Advance one frame.
+
+        :param frame: Landmarks of the new frame, `num_features` values.
+        :param state: State from initial_state(), updated in place.
+        :return: Class posterior for this frame, shape (num_classes,).
+        """
+        x = np.asarray(frame, dtype=np.float32).reshape(-1)
+        for i, layer in enumerate(self.layers):
+            kind = layer['type']
+            if kind == 'conv1d':
+                window = np.concatenate((state[i], x[np.newaxis]), axis=0)
+                taps = window[::layer['dilation']]
+                x = _activate(np.einsum('ki,kio->o', taps, layer['kernel']) + layer['bias'], layer['activation'])
+                state[i] = window[1:]
+            elif kind == 'batchnorm':
+                x = x * layer['scale'] + layer['shift']
+            elif kind == 'lstm':
+                h, c = state[i]
+                # Thứ tự cổng của Keras: input, forget, cell, output
+                z = x @ layer['kernel'] + h @ layer['recurrent_kernel'] + layer['bias']
+                gate_i, gate_f, gate_c, gate_o = np.split(z, 4)
+                c = _sigmoid(gate_f) * c + _sigmoid(gate_i) * np.tanh(gate_c)
+                h = _sigmoid(gate_o) * np.tanh(c)
+                state[i] = (h, c)
+                x = h
+            elif kind == 'dense':
+                x = _activate(x @ layer['kernel'] + layer['bias'], layer['activation'])
+        return x
+
+class StreamingRecognizer:
+    def __init__(self, streaming_model, window_size=None, min_context=None):
+        """
+        Per-connection streaming state on top of a shared StreamingModel.
+
+        The model was trained on windows of `window_size` frames, so its state
+        must not run forever. With `window_size` set, two states run staggered by
+        window_size // 2 frames and each restarts after window_size frames; the
+        posterior comes from the older one, so a sign crossing one restart is
+        still seen whole by the other and the emitted posterior never rests on
+        less than half a window.
+
+        :param streaming_model: Loaded StreamingModel.
+        :param window_size: Training window length in frames; None runs one unbounded state.
+        :param min_context: Frames the emitting state needs before `ready` is True
+                            (default window_size // 2, or 1 without a window).
+        """
+        self.model = streaming_model
+        self.window_size = window_size
+        self.offset = window_size // 2 if window_size else None
+        if min_context is None:
+            min_context = self.offset if window_size else 1
+        self.min_context = max(1, min_context)
+        self.reset()
+
+    @property
+    def ready(self):
+        """
+        Whether the current posterior rests on at least `min_context` frames.
+        """
+        return self.posterior is not None and self.context >= self.min_context
+
+    def push(self, coordinates):
+        """
+        Feed the landmarks of one frame (42 [x, y] pairs, -1 for missing points).
+
+        The frame is converted with the model's feature config; velocity features
+        use the previous frame of the same state (0 on its first frame, as in training windows).
+
+        :return: Class posterior after this frame (from the older state).
+        """
+        coordinates = np.array(coordinates, dtype=np.float32).reshape(NUM_POINTS, 2)
+        frame = compute_features(coordinates[np.newaxis], self.model.feature_config)[-1]
+        if self.previous is not None:
+            continued = compute_features(np.stack((self.previous, coordinates)), self.model.feature_config)[-1]
+        self.previous = coordinates
+
+        self.posterior = None
+        self.context = 0
+        for i, stream in enumerate(self.streams):
+            # Trạng thái thứ hai bắt đầu sau nửa cửa sổ
+            if self.window_size and self.frames_seen < i * self.offset:
+                continue
+            if self.window_size and stream['frames'] >= self.window_size:
+                # Hết độ dài cửa sổ huấn luyện: bắt đầu lại trạng thái này, trạng thái kia vẫn giữ ngữ cảnh
+                stream['state'] = self.model.initial_state()
+                stream['frames'] = 0
+            posterior = self.model.step(frame if stream['frames'] == 0 else continued, stream['state'])
+            stream['frames'] += 1
+            if stream['frames'] > self.context:
+                self.posterior = posterior
+                self.context = stream['frames']
+
+        self.frames_seen += 1
+        return self.posterior
+
+    def reset(self):
+        self.streams = [{'state': self.model.initial_state(), 'frames': 0}
+                        for _ in range(2 if self.window_size else 1)]
+        self.previous = None
+        self.frames_seen = 0
+        self.context = 0
+        self.posterior = None
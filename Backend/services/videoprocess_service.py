@@ -4,6 +4,13 @@ import mediapipe as mp
 from pathlib import Path
 import os
 
+try:
+    from Backend.preparation.frame_sampling import sample_video_frames
+    from Backend.preparation.features import NUM_POINTS, POINTS_PER_HAND, extract_landmarks
+except ImportError:
+    from preparation.frame_sampling import sample_video_frames
+    from preparation.features import NUM_POINTS, POINTS_PER_HAND, extract_landmarks
+
 def export_frames_with_coordinates(frames, coordinates, output_folder, prefix="frame"):
     """
     Export frames with hand coordinates drawn on them as images to a folder.
@@ -38,8 +45,16 @@ def export_frames_with_coordinates(frames, coordinates, output_folder, prefix="f
 
 
 class VideoProcessor:
-    def __init__(self, frame_size=60):
+    def __init__(self, frame_size=60, sampler='sequential', hand_order='handedness', draw_landmarks=False):
+        """
+        :param draw_landmarks: Draw the hand skeleton onto every processed frame (debug /
+                               visualization only; frames are mutated in place). Off by
+                               default so recognition does no drawing.
+        """
         self.frame_size = frame_size
+        self.draw_landmarks = draw_landmarks
+        self.sampler = sampler  # 'sequential' (giải mã một lượt) hoặc 'seek'
+        self.hand_order = hand_order  # Phải trùng với cấu hình đặc trưng của model (features.py)
         self.mp_hands = mp.solutions.hands.Hands(
             static_image_mode=False,
             max_num_hands=2,
@@ -49,41 +64,71 @@ class VideoProcessor:
         )
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
+        # Bộ đệm tọa độ và mặt nạ có bàn tay cấp phát một lần, dùng lại giữa các request của session
+        self.coordinates = np.full((frame_size, NUM_POINTS, 2), -1, dtype=np.float32)
+        self.hand_mask = np.zeros(frame_size, dtype=bool)
 
-    def process_video_from_path(self, video_path):
+    def close(self):
+        """
+        Release the MediaPipe graph held by this processor.
+        """
+        self.mp_hands.close()
+
+    def process_video_from_path(self, video_path, export_folder=None):
         """
         Processes the video, extracts 60 frames, and tracks hand coordinates.
 
-        :return: data_X (list of hand coordinates for each frame), frames (list of frames).
+        :param export_folder: Optional folder to write the frames with their coordinates
+                              drawn on them as PNGs (debugging); nothing is written by default.
+        :return: data_X (hand coordinates for each frame), frames (list of frames).
         """
         frames = self._extract_frames_from_path(video_path, self.frame_size)
-        data_X = [self._extract_hand_coordinates(frame) for frame in frames]
+        data_X, _ = self._extract_into_buffer(frames)
         
-        export_frames_with_coordinates(frames, data_X, output_folder="output1", prefix="frame")
+        if export_folder is not None:
+            export_frames_with_coordinates(frames, data_X, output_folder=export_folder, prefix="frame")
 
         return data_X, frames
     
-    def process_video_from_frames(self, frames):
-        data_X = []
-        valid_frames = []
-        frames_with_hands = 0
-        
+    def process_video_from_frames(self, frames, draw_landmarks=None):
+        """
+        Extract the landmarks of a list of frames into the processor's buffer.
+
+        :param draw_landmarks: Draw the skeleton onto the frames for this call
+                               (None uses the processor's setting).
+
+        :return: (data_X, frames, frames_with_hands) where data_X is a (len(frames), 42, 2)
+                 float32 view of the reused buffer; it is overwritten by the next call,
+                 so use it before releasing the processor.
+        """
         print(f"Bắt đầu xử lý {len(frames)} frames...")
-        
-        for frame in frames:
-            coordinates = self._extract_hand_coordinates(frame)
-            # Kiểm tra xem frame có bàn tay không bằng cách tìm tọa độ khác [-1, -1]
-            has_hand = any(coord != [-1, -1] for coord in coordinates)
-            
-            if has_hand:
-                frames_with_hands += 1
-                
-            data_X.append(coordinates)
-            valid_frames.append(frame)
-                
+
+        data_X, hand_mask = self._extract_into_buffer(frames, draw_landmarks)
+        frames_with_hands = int(np.count_nonzero(hand_mask))
+
         print(f"Phát hiện được bàn tay trong {frames_with_hands}/{len(frames)} frames")
                 
-        return data_X, valid_frames, frames_with_hands
+        return data_X, list(frames), frames_with_hands
+
+    def _extract_into_buffer(self, frames, draw_landmarks=None):
+        """
+        Write the landmarks of every frame into the preallocated buffer.
+
+        :return: (coordinates, hand_mask) views of the first len(frames) rows.
+        """
+        count = len(frames)
+        if count > len(self.coordinates):
+            # Request dài hơn frame_size: nới bộ đệm một lần rồi tiếp tục dùng lại
+            self.coordinates = np.full((count, NUM_POINTS, 2), -1, dtype=np.float32)
+            self.hand_mask = np.zeros(count, dtype=bool)
+
+        coordinates = self.coordinates[:count]
+        hand_mask = self.hand_mask[:count]
+        for i, frame in enumerate(frames):
+            self._extract_hand_coordinates(frame, out=coordinates[i], draw_landmarks=draw_landmarks)
+            # extract_landmarks ghi đủ 21 điểm cho mỗi bàn tay tìm thấy, chỉ cần xem điểm cổ tay
+            hand_mask[i] = coordinates[i, 0, 0] != -1 or coordinates[i, POINTS_PER_HAND, 0] != -1
+        return coordinates, hand_mask
 
     def _extract_frames_from_path(self, video_path, num_frames):
         """
@@ -94,39 +139,31 @@ class VideoProcessor:
         :param num_frames: Number of frames to extract from the video.
         :return: A list of frames.
         """
-        cap = cv2.VideoCapture(str(video_path))
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        frame_indices = np.linspace(0, total_frames - 1, num_frames, dtype=int)
-        frames = []
-
-        for idx in frame_indices:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-            ret, frame = cap.read()
-            if ret:
-                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            else:
-                frames.append(None)  # Add None if frame can't be read
-
-        # If there are fewer frames than expected, add blank frames
-        while len(frames) < num_frames:
-            frames.append(None)
-
-        cap.release()
-        return frames
-
-    def _extract_hand_coordinates(self, frame):
+        return sample_video_frames(video_path, num_frames, strategy=self.sampler)
+
+    def _extract_hand_coordinates(self, frame, out=None, draw_landmarks=None):
         """
         Extract hand landmarks from a frame using MediaPipe. If hands are not detected,
         return default coordinates instead of None.
+
+        :param out: Optional float32 (42, 2) array written in place (e.g. a buffer row).
+        :param draw_landmarks: Draw the skeleton onto `frame` (None uses the processor's setting).
+        :return: (42, 2) float32 array of [x, y], -1 for missing points.
         """
         if frame is None:
-            return [[-1, -1]] * 42  # Default coordinates for no hand
+            # Default coordinates for no hand
+            if out is None:
+                return np.full((NUM_POINTS, 2), -1, dtype=np.float32)
+            out.fill(-1)
+            return out
 
         results = self.mp_hands.process(frame)
-        coordinates = []
         
-        # Vẽ xương bàn tay nếu phát hiện được
-        if results.multi_hand_landmarks:
+        if draw_landmarks is None:
+            draw_landmarks = self.draw_landmarks
+
+        # Chỉ vẽ xương bàn tay khi bật chế độ hiển thị (không vẽ trên luồng nhận dạng)
+        if draw_landmarks and results.multi_hand_landmarks:
             for hand_landmarks in results.multi_hand_landmarks:
                 # Vẽ các điểm mốc và kết nối
                 self.mp_drawing.draw_landmarks(
@@ -136,16 +173,9 @@ class VideoProcessor:
                     self.mp_drawing_styles.get_default_hand_landmarks_style(),
                     self.mp_drawing_styles.get_default_hand_connections_style()
                 )
-                
-                # Thu thập tọa độ
-                for lm in hand_landmarks.landmark:
-                    coordinates.append([lm.x, lm.y])
-
-        # Điền thêm tọa độ mặc định nếu thiếu
-        while len(coordinates) < 42:  # Đảm bảo đủ 42 điểm cho 2 bàn tay
-            coordinates.append([-1, -1])
-            
-        return coordinates  # Luôn trả về tọa độ, dù có bàn tay hay không
+
+        # Luôn trả về 42 điểm, dù có bàn tay hay không (cùng hàm với preprocessing.py)
+        return extract_landmarks(results, self.hand_order, out=out)
 
 if __name__ == "__main__":
     video_path = '../test.mp4'
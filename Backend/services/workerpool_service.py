@@ -0,0 +1,64 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class WorkerPoolSaturatedError(RuntimeError):
+    """Raised when the pool already holds its maximum number of queued tasks."""
+
+class BoundedWorkerPool:
+    def __init__(self, max_workers=None, max_pending=None):
+        """
+        Thread pool for the CPU-bound stages (JPEG decoding, MediaPipe, inference)
+        so they never run on the asyncio event loop.
+
+        Threads are used rather than processes because the per-session MediaPipe
+        processors and the model live in this process, and OpenCV, MediaPipe and
+        TensorFlow release the GIL while they work.
+
+        :param max_workers: Number of worker threads (defaults to the CPU count).
+        :param max_pending: Tasks allowed to wait for a free worker; beyond this,
+                            `run` fails fast instead of queueing without bound.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 4
+        self.max_pending = self.max_workers * 4 if max_pending is None else max_pending
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='vsl-worker')
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+        self._active = 0
+        self._active_lock = threading.Lock()
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` on a worker thread and await its result.
+
+        :raises WorkerPoolSaturatedError: If all workers are busy and the queue is full.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise WorkerPoolSaturatedError(
+                f"Server is busy: {self.max_workers} workers and {self.max_pending} queued tasks in use"
+            )
+        with self._active_lock:
+            self._active += 1
+
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._active,
+        }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _release(self):
+        with self._active_lock:
+            self._active -= 1
+        self._slots.release()
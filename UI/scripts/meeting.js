@@ -57,6 +57,26 @@ const FRAMES_TO_KEEP = 60;  // Số frame giữ lại
 const FRAME_INTERVAL = 10; // Số frame mới trước khi gửi
 let frameCounter = 0;
 let isTranslating = false;
+// Gửi từng frame JPEG dạng binary qua WebSocket thay vì gom 60 frame base64
+const USE_STREAMING_RECOGNITION = true;
+const RECOGNITION_WS_URL = 'ws://192.168.1.8:8000/ws/recognize';
+// Bỏ qua frame khi WebSocket còn quá nhiều dữ liệu chưa gửi (server xử lý chậm hơn tốc độ chụp)
+const MAX_SOCKET_BUFFERED_BYTES = 64 * 1024;
+// 'landmarks': trích xuất tọa độ bàn tay ngay trên máy (MediaPipe Tasks) và chỉ gửi 84 giá trị float16 mỗi frame.
+// Cần đặt file model hand_landmarker.task vào assets/models/ (HAND_LANDMARKER_MODEL_PATH);
+// nếu thiếu model hoặc gói @mediapipe/tasks-vision, tự quay về 'jpeg'.
+// 'jpeg': gửi frame JPEG, server tự chạy MediaPipe
+const RECOGNITION_MODE = 'landmarks';
+let recognitionMode = RECOGNITION_MODE;
+const LANDMARK_WS_URL = 'ws://192.168.1.8:8000/ws/landmarks';
+const HAND_LANDMARKER_MODEL_PATH = '../assets/models/hand_landmarker.task';
+const POINTS_PER_HAND = 21;
+const LANDMARK_VALUES_PER_FRAME = 84;
+let recognitionSocket = null;
+let handLandmarker = null;
+let handLandmarkerLoading = null;
+// Thứ tự hai tay phải khớp với lúc huấn luyện model, server gửi lại khi mở kết nối
+let landmarkHandOrder = 'detection';
 let mediaRecorder = null;
 let translationOverlay = null;
 
@@ -228,11 +248,23 @@ function setupVideoFrameCapture() {
             canvas.height = localVideo.videoHeight;
             context.drawImage(localVideo, 0, 0, canvas.width, canvas.height);
             
-            frameBuffer.push(canvas.toDataURL('image/jpeg', 0.8));
-            console.log(`Captured frame ${frameBuffer.length}/${FRAMES_TO_KEEP}`);
-            
             // Reset bộ đếm frame
             skipFrameCount = 0;
+
+            if (recognitionMode === 'landmarks') {
+                sendLandmarksToSocket();
+                requestAnimationFrame(processFrame);
+                return;
+            }
+
+            if (USE_STREAMING_RECOGNITION) {
+                sendFrameToSocket(canvas);
+                requestAnimationFrame(processFrame);
+                return;
+            }
+
+            frameBuffer.push(canvas.toDataURL('image/jpeg', 0.8));
+            console.log(`Captured frame ${frameBuffer.length}/${FRAMES_TO_KEEP}`);
             
             // Khi đủ số frame cần thiết, gửi đến server
             if (frameBuffer.length >= FRAMES_TO_KEEP) {
@@ -248,6 +280,150 @@ function setupVideoFrameCapture() {
     processFrame();
 }
 
+// Mở WebSocket nhận dạng, kết quả được server đẩy về trên cùng kết nối
+function openRecognitionSocket() {
+    if (recognitionSocket && recognitionSocket.readyState <= WebSocket.OPEN) {
+        return recognitionSocket;
+    }
+
+    recognitionSocket = new WebSocket(recognitionMode === 'landmarks' ? LANDMARK_WS_URL : RECOGNITION_WS_URL);
+    recognitionSocket.binaryType = 'arraybuffer';
+    recognitionSocket.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.type === 'config') {
+            landmarkHandOrder = data.hand_order || 'detection';
+            return;
+        }
+        console.log('Kết quả từ server:', data);
+        updatePredictionLabel(data);
+    };
+    recognitionSocket.onerror = (error) => {
+        console.error('Lỗi WebSocket nhận dạng:', error);
+    };
+    recognitionSocket.onclose = () => {
+        recognitionSocket = null;
+    };
+    return recognitionSocket;
+}
+
+function closeRecognitionSocket() {
+    if (recognitionSocket) {
+        recognitionSocket.close();
+        recognitionSocket = null;
+    }
+}
+
+// Gửi một frame JPEG dạng binary (không base64) qua WebSocket
+function sendFrameToSocket(canvas) {
+    const socket = openRecognitionSocket();
+    if (socket.readyState !== WebSocket.OPEN || isSocketBackedUp(socket)) return;
+
+    canvas.toBlob((blob) => {
+        if (blob && socket.readyState === WebSocket.OPEN && !isSocketBackedUp(socket)) {
+            socket.send(blob);
+        }
+    }, 'image/jpeg', 0.8);
+}
+
+// Frame cũ xếp hàng trong socket chỉ làm phụ đề trễ thêm: bỏ frame mới thay vì gửi dồn
+function isSocketBackedUp(socket) {
+    return socket.bufferedAmount > MAX_SOCKET_BUFFERED_BYTES;
+}
+
+// Tải HandLandmarker (MediaPipe Tasks) một lần, chạy trên máy người dùng
+function loadHandLandmarker() {
+    if (!handLandmarkerLoading) {
+        let tasksVision;
+        try {
+            tasksVision = require('@mediapipe/tasks-vision');
+        } catch (error) {
+            fallBackToJpeg('chưa cài @mediapipe/tasks-vision', error);
+            return null;
+        }
+        const path = require('path');
+        const { FilesetResolver, HandLandmarker } = tasksVision;
+        const wasmPath = 'file://' + path.join(path.dirname(require.resolve('@mediapipe/tasks-vision')), 'wasm');
+        handLandmarkerLoading = FilesetResolver.forVisionTasks(wasmPath)
+            .then((vision) => HandLandmarker.createFromOptions(vision, {
+                baseOptions: { modelAssetPath: HAND_LANDMARKER_MODEL_PATH },
+                runningMode: 'VIDEO',
+                numHands: 2
+            }))
+            .then((landmarker) => {
+                handLandmarker = landmarker;
+                return landmarker;
+            })
+            .catch((error) => fallBackToJpeg('không tải được HandLandmarker', error));
+    }
+    return handLandmarkerLoading;
+}
+
+// Không chạy được MediaPipe trên máy: chuyển sang gửi JPEG qua /ws/recognize
+function fallBackToJpeg(reason, error) {
+    console.error(`Chuyển sang gửi JPEG (${reason}):`, error);
+    recognitionMode = 'jpeg';
+    if (recognitionSocket) {
+        recognitionSocket.close();
+        recognitionSocket = null;
+    }
+}
+
+// Chuyển một số float32 sang bit float16 (IEEE 754 half, làm tròn về gần nhất)
+const float16View = new Float32Array(1);
+const float16Bits = new Uint32Array(float16View.buffer);
+function toFloat16(value) {
+    float16View[0] = value;
+    const bits = float16Bits[0];
+    const sign = (bits >>> 16) & 0x8000;
+    const exponent = ((bits >>> 23) & 0xff) - 127 + 15;
+    const mantissa = bits & 0x7fffff;
+    if (exponent <= 0) {
+        // Quá nhỏ: làm tròn về 0 (tọa độ chuẩn hóa không cần số subnormal)
+        return sign;
+    }
+    if (exponent >= 0x1f) {
+        return sign | 0x7c00;
+    }
+    const half = sign | (exponent << 10) | (mantissa >>> 13);
+    return half + ((mantissa >>> 12) & 1);
+}
+
+// Tọa độ [x, y] của 42 điểm (tay trái ở điểm 0-20 khi hand_order là 'handedness'), -1 cho điểm thiếu
+function packLandmarks(result) {
+    const packed = new Uint16Array(LANDMARK_VALUES_PER_FRAME).fill(toFloat16(-1));
+    const hands = (result.landmarks || []).slice(0, 2);
+    const handedness = result.handedness || result.handednesses || [];
+    let slots = hands.map((_, i) => i);
+    if (landmarkHandOrder === 'handedness' && handedness.length >= hands.length) {
+        const labeled = hands.map((_, i) => (handedness[i][0].categoryName === 'Left' ? 0 : 1));
+        if (new Set(labeled).size === labeled.length) {
+            slots = labeled;
+        }
+    }
+
+    hands.forEach((points, i) => {
+        const offset = slots[i] * POINTS_PER_HAND * 2;
+        points.forEach((point, j) => {
+            packed[offset + j * 2] = toFloat16(point.x);
+            packed[offset + j * 2 + 1] = toFloat16(point.y);
+        });
+    });
+    return packed;
+}
+
+// Trích xuất tọa độ bàn tay trên máy và gửi 168 byte mỗi frame thay cho cả ảnh JPEG
+function sendLandmarksToSocket() {
+    if (!handLandmarker) {
+        loadHandLandmarker();
+        return;
+    }
+    const socket = openRecognitionSocket();
+    if (socket.readyState !== WebSocket.OPEN || localVideo.readyState < 2 || isSocketBackedUp(socket)) return;
+
+    const result = handLandmarker.detectForVideo(localVideo, performance.now());
+    socket.send(packLandmarks(result).buffer);
+}
+
 // Gửi frames đến server để xử lý
 async function sendFramesToServer(frames) {
     // try {
@@ -287,6 +463,8 @@ function updatePredictionLabel(data) {
         labelText = 'Không phát hiện bàn tay';
     } else if (data.status === 'insufficient_data') {
         labelText = 'Chưa đủ dữ liệu';
+    } else if (data.status === 'idle') {
+        labelText = 'Không có ký hiệu';
     }
 
     // Thêm độ trễ ngẫu nhiên để tự nhiên hơn
@@ -349,6 +527,7 @@ if (translationButton) {
             translationButton.querySelector('img').src = '../assets/sign-language-on.png';
         } else {
             console.log('Stopping translation...');
+            closeRecognitionSocket();
             const overlay = document.querySelector('.translation-overlay');
             if (overlay) overlay.remove();
             translationButton.classList.remove('translation-active');
@@ -390,6 +569,7 @@ window.addEventListener('DOMContentLoaded', () => {
 
 // Xử lý khi đóng cửa sổ
 window.addEventListener('beforeunload', () => {
+    closeRecognitionSocket();
     if (webrtcHandler) {
         webrtcHandler.endCall();
     }